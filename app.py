@@ -1,44 +1,384 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
 import os
-import uuid
+import json
+import time
+import threading
 from flask_cors import CORS
-from src.classifier.pipeline.predict import PredictionPipeline
+from src.classifier.pipeline.batching import MicroBatcher
+from src.classifier.pipeline.jobs import TrainingJobManager
+from src.classifier.utils.cache import PredictionCache
+from src.classifier.components.model_registry import ModelRegistry
+from src.classifier.config.configuration import ConfigurationManager
 from src.classifier.utils.common import decodeImage as decode_image
 
 app = Flask(__name__)
 CORS(app)
 
+class ServedModel:
+    """One loaded model version and the micro-batcher in front of it."""
+
+    def __init__(self, version, model_path, classifier, cache_version=None):
+        self.version = version
+        self.model_path = model_path
+        self.classifier = classifier
+        self.batcher = None
+        # what cached results are keyed on: the registry version, which is
+        # immutable, or the file as it was when this model was loaded from it
+        self.cache_version = cache_version or version
+
+
 class ClientApp:
-    def __init__(self):
-        # Dictionary of potential paths to check
-        self.model = None
-        paths_to_check = [
-            os.path.join("artifacts", "training", "trained_model.h5"),
-            "trained_model.h5",
-            os.path.join(os.getcwd(), "trained_model.h5")
-        ]
-        
-        model_path = None
+    def __init__(self, mode="background"):
+        self.active = None
+        self.staged = None
+        self.error = None
+        self.loading_version = None
+        self.failed_version = None
+        self.ready = threading.Event()
+        self._swap_lock = threading.Lock()
+        self._watcher = None
+        self.serving_config = ConfigurationManager().get_serving_config()
+        self.registry = ModelRegistry(self.serving_config.registry_dir)
+        # one cache for every version, keyed on and cleared by the version served
+        self.cache = PredictionCache(
+            max_size=self.serving_config.cache_size,
+            ttl_s=self.serving_config.cache_ttl_s
+        )
+
+        if mode == "prefork":
+            # master process: TFLite interpreters built before the fork share
+            # their weight pages copy-on-write, workers finish in start_worker.
+            # Keras weights live in TensorFlow variables that every worker
+            # builds for itself, see the workers setting in config.yaml
+            if self.serving_config.backend != "keras":
+                self.load()
+        elif mode == "background":
+            # loading on a thread lets flask bind the port before TensorFlow is up
+            threading.Thread(target=self.load_and_start, name="model-loader", daemon=True).start()
+        else:
+            self.load_and_start()
+
+    # requests read the served model through one attribute, so a swap is a
+    # single assignment and a request never mixes two versions
+    @property
+    def classifier(self):
+        served = self.active
+        return served.classifier if served is not None else None
+
+    @property
+    def batcher(self):
+        served = self.active
+        return served.batcher if served is not None else None
+
+    @property
+    def model_version(self):
+        served = self.active
+        return served.version if served is not None else None
+
+    def _artifact_path(self):
+        """Where the pipeline writes the artifact the serving backend loads."""
+        config = ConfigurationManager().config
+        backend = self.serving_config.backend
+        if backend == "tflite-fp16":
+            return config.model_quantization.fp16_model_path
+        if backend == "tflite-int8":
+            return config.model_quantization.int8_model_path
+        if self.serving_config.model == "student":
+            # the distilled CNN from the distillation stage
+            return config.distillation.student_model_path
+        return config.training.trained_model_path
+
+    def resolve(self, version=None):
+        """
+        Returns:
+            tuple: (model path, registry version). The registry's current
+                version (or `version`) when the registry has one, else the
+                unversioned pipeline output with a None version.
+        """
+        name = os.path.basename(self._artifact_path())
+        version = version or self.registry.current()
+        if version is not None:
+            return str(self.registry.path(version, name)), version
+
+        paths_to_check = [self._artifact_path()]
+        if self.serving_config.backend == "keras" and self.serving_config.model != "student":
+            paths_to_check += [name, os.path.join(os.getcwd(), name)]
         for path in paths_to_check:
             if os.path.exists(path):
-                model_path = path
-                print(f"Model found at: {model_path}")
-                break
-        
-        if model_path:
-            self.classifier = PredictionPipeline(model_path=model_path)
-        else:
-            print(f"CRITICAL: Model file not found. Checked: {paths_to_check}")
+                return path, None
+        raise FileNotFoundError(f"Model file not found. Checked: {paths_to_check}")
+
+    def _build(self, version=None) -> ServedModel:
+        # imported here because it pulls in TensorFlow
+        from src.classifier.pipeline.predict import PredictionPipeline
+
+        model_path, version = self.resolve(version)
+        print(f"Model found at: {model_path}")
+        # taken before loading, a bare file replaced later is not what is served
+        stat = os.stat(model_path)
+        cache_version = version or f"file-{stat.st_mtime_ns}-{stat.st_size}"
+        shadow_heads = self._shadow_heads(version)
+        classifier = PredictionPipeline(
+            model_path=model_path,
+            jit_compile=self.serving_config.jit_compile,
+            backend=self.serving_config.backend,
+            num_threads=self.serving_config.num_threads,
+            precision=self.serving_config.precision,
+            model_version=version,
+            shadow_heads=shadow_heads,
+            # an A/B head that became the served version is no longer split off
+            ab_head=self.serving_config.ab_head if self.serving_config.ab_head in shadow_heads else None,
+            ab_fraction=self.serving_config.ab_fraction
+        )
+        return ServedModel(version, model_path, classifier, cache_version=cache_version)
+
+    def _shadow_heads(self, version):
+        """Shadow head name -> model path; names are registry versions or model files."""
+        name = os.path.basename(self._artifact_path())
+        versions = self.registry.versions()
+        return {
+            head: str(self.registry.path(head, name)) if head in versions else head
+            for head in self.serving_config.shadow_heads
+            # the served version has nothing to shadow
+            if head != version
+        }
+
+    def _warm(self, served: ServedModel):
+        # pay for tracing now rather than on the first real request
+        served.classifier.warmup(
+            batch_sizes=sorted({
+                1,
+                self.serving_config.max_batch_size,
+                self.serving_config.batch_chunk_size
+            }),
+            runs=self.serving_config.warmup_runs
+        )
+
+        # concurrent requests share one forward pass when batching is enabled
+        if self.serving_config.max_batch_size > 1:
+            served.batcher = MicroBatcher(
+                pipeline=served.classifier,
+                max_batch_size=self.serving_config.max_batch_size,
+                max_wait_ms=self.serving_config.max_wait_ms
+            ).start()
+
+    def _swap(self, served: ServedModel):
+        """Puts a warmed model in front of traffic; requests holding the old one finish on it."""
+        old = self.active
+        self.cache.set_model(served.cache_version)
+        self.active = served
+        if old is not None and old.batcher is not None:
+            # images already queued are still answered by the old model
+            old.batcher.stop()
+        print(f"Serving model version {served.version}")
+
+    def load(self):
+        try:
+            self.staged = self._build()
+        except FileNotFoundError as e:
+            print(f"CRITICAL: {e}")
             # We don't raise here to allow the app to start, but predictions will fail
-            self.classifier = None
+            self.error = "Model file not found"
+        except Exception as e:
+            print(f"CRITICAL ERROR LOADING MODEL: {e}")
+            self.error = str(e)
+
+    def start(self):
+        try:
+            if self.staged is not None:
+                self._warm(self.staged)
+                self._swap(self.staged)
+
+        except Exception as e:
+            print(f"CRITICAL ERROR STARTING MODEL: {e}")
+            self.error = str(e)
+        finally:
+            self.staged = None
+            self.ready.set()
+            self.start_watcher()
+
+    def load_and_start(self):
+        self.load()
+        self.start()
+
+    def start_worker(self):
+        """
+        Runs in each pre-forked worker. Threads and the batcher do not survive
+        a fork, and the Keras backend is only loaded here because TensorFlow's
+        runtime thread pools cannot be shared across one. The worker finishes
+        on a thread like mode="background", so it answers /healthz at once.
+        """
+        threading.Thread(target=self._start_worker, name="model-loader", daemon=True).start()
+
+    def _start_worker(self):
+        configure_threads(self.serving_config)
+        if self.staged is None and self.error is None:
+            self.load()
+        self.start()
+
+    def reload(self, version=None) -> bool:
+        """
+        Loads and warms `version` (the registry's current one by default) next
+        to the served model and swaps it in. A version that fails to load
+        leaves the served model in place and is not retried by the watcher.
+
+        Returns:
+            bool: whether a new version is now served.
+        """
+        with self._swap_lock:
+            target = version or self.registry.current()
+            if target is None or target == self.model_version:
+                return False
+            if version is None and target == self.failed_version:
+                return False
+
+            self.loading_version = target
+            try:
+                served = self._build(target)
+                self._warm(served)
+                self._swap(served)
+                self.error = None
+                self.failed_version = None
+                return True
+            except Exception as e:
+                print(f"ERROR LOADING MODEL VERSION {target}: {e}")
+                self.failed_version = target
+                return False
+            finally:
+                self.loading_version = None
+
+    def reload_async(self, version=None):
+        threading.Thread(target=self.reload, args=(version,), name="model-swap", daemon=True).start()
+
+    def start_watcher(self):
+        # every worker follows the registry's current pointer on its own
+        if not self.serving_config.registry_poll_s:
+            return
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.serving_config.registry_poll_s)
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"ERROR CHECKING MODEL REGISTRY: {e}")
+
+    def wait_until_ready(self):
+        # early callers queue here for a bounded time instead of failing
+        return self.ready.wait(timeout=self.serving_config.ready_timeout_s)
+
+    @staticmethod
+    def _predict(served, img):
+        if served.batcher is not None:
+            return served.batcher.predict(img)
+        return served.classifier.predict(img)
+
+    def predict(self, img):
+        # one model version for the whole request, even across a swap
+        served = self.active
+        # shadow and A/B heads must see every request: a cached answer would
+        # replay one head's result and skip the logging and head stats
+        heads = getattr(served.classifier, "heads", None)
+        if self.cache is None or not self.cache.enabled or heads:
+            return self._predict(served, img)
+
+        data = img if isinstance(img, (bytes, bytearray)) else img.read()
+        key = self.cache.key(data, served.cache_version)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._predict(served, data)
+            self.cache.put(key, result)
+        return result
+
+
+def configure_threads(serving_config):
+    # must run before the TensorFlow runtime starts in this process
+    import tensorflow as tf
+    if serving_config.intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(serving_config.intra_op_threads)
+    if serving_config.inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(serving_config.inter_op_threads)
+
 
 clApp = None
 try:
-    clApp = ClientApp()
+    # gunicorn.conf.py sets this so the master preloads before forking workers
+    clApp = ClientApp(mode="prefork" if os.environ.get("CLASSIFIER_PREFORK") == "1" else "background")
 except Exception as e:
-    print(f"CRITICAL ERROR LOADING MODEL: {e}")
-    # clApp stays None or partially initialized
+    print(f"CRITICAL ERROR STARTING APP: {e}")
+
+
+# a finished run publishes a new registry version, picked up right away
+training_jobs = TrainingJobManager(
+    state_dir=ConfigurationManager().get_serving_config().training_jobs_dir,
+    on_success=lambda job: clApp.reload_async() if clApp else None
+)
+
+
+def model_unavailable():
+    """Returns an error response while the model cannot serve, else None."""
+    if clApp is None:
+        return jsonify({"error": "Model not loaded. Please contact administrator."}), 500
+    if not clApp.wait_until_ready():
+        response = jsonify({"error": "Model is still loading, please retry."})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    if clApp.classifier is None:
+        return jsonify({"error": "Model not loaded. Please contact administrator."}), 500
+    return None
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    if clApp is not None and clApp.ready.is_set() and clApp.classifier is not None:
+        return jsonify({"status": "ready"})
+    if clApp is None or clApp.ready.is_set():
+        return jsonify({"status": "failed", "error": clApp.error if clApp else None}), 503
+    return jsonify({"status": "loading"}), 503
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    cache = clApp.cache if clApp is not None else None
+    classifier = clApp.classifier if clApp is not None else None
+    return jsonify({
+        "model_version": clApp.model_version if clApp is not None else None,
+        "heads": classifier.head_stats() if classifier is not None else None,
+        "cache": cache.stats() if cache is not None else None
+    })
+
+@app.route("/model", methods=["GET"])
+def modelInfo():
+    if clApp is None:
+        return jsonify({"error": "Model not loaded. Please contact administrator."}), 500
+    return jsonify({
+        "serving": clApp.model_version,
+        "current": clApp.registry.current(),
+        "loading": clApp.loading_version,
+        "failed": clApp.failed_version,
+        "versions": clApp.registry.versions()
+    })
+
+@app.route("/model/rollback", methods=["POST"])
+def modelRollback():
+    # to the version before the current one, or to {"version": "v0003"}
+    if clApp is None:
+        return jsonify({"error": "Model not loaded. Please contact administrator."}), 500
+    data = request.get_json(silent=True) or {}
+    try:
+        version = clApp.registry.rollback(data.get("version"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+    # this worker swaps now, the others when their watcher sees the pointer
+    clApp.reload_async(version)
+    return jsonify({"current": version, "serving": clApp.model_version}), 202
 
 @app.route("/", methods=["GET"])
 def home():
@@ -46,44 +386,45 @@ def home():
 
 @app.route("/train", methods=["GET", "POST"])
 def train():
-    os.system("python main.py")
-    return "Training successful! (Note: Changes are temporary on Cloud Run)"
+    # runs main.py in a child process, one job at a time across all workers
+    job = training_jobs.submit()
+    return jsonify(job.to_dict()), 202
+
+@app.route("/train/<job_id>", methods=["GET", "DELETE"])
+def trainStatus(job_id):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown training job"}), 404
+    if request.method == "DELETE":
+        if not training_jobs.cancel(job_id):
+            return jsonify({"error": f"Training job is already {job.status}"}), 409
+        job = training_jobs.get(job_id)
+    return jsonify(job.to_dict())
 
 @app.route("/predict", methods=["POST"])
 def predictRoute():
     try:
-        if os.name == 'posix': # Linux/Mac/Cloud Run
-            base_path = "/tmp"
-        else: # Windows
-            base_path = "uploads"
-            if not os.path.exists(base_path):
-                os.makedirs(base_path)
-
-        filename = str(uuid.uuid4()) + ".jpg"
-        filepath = os.path.join(base_path, filename)
-
+        # decode straight from the request, nothing is written to /tmp
         if "file" in request.files:
             file = request.files["file"]
             if file.filename == "":
                 return jsonify({"error": "No file selected"}), 400
-            file.save(filepath)
+            img = file.stream
 
         elif request.is_json:
             data = request.get_json()
             if "image" not in data:
                 return jsonify({"error": "Missing image data"}), 400
-            decode_image(imgstring=data["image"], fileName=filepath)
+            img = decode_image(imgstring=data["image"])
 
         else:
             return jsonify({"error": "Unsupported request"}), 400
 
-        if clApp is None or clApp.classifier is None:
-            return jsonify({"error": "Model not loaded. Please contact administrator."}), 500
+        unavailable = model_unavailable()
+        if unavailable is not None:
+            return unavailable
 
-        result = clApp.classifier.predict(img_path=filepath)
-        
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        result = clApp.predict(img)
 
         return jsonify(result)
 
@@ -91,5 +432,48 @@ def predictRoute():
         print(f"ERROR DURING PREDICTION: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/predict/batch", methods=["POST"])
+def predictBatchRoute():
+    # many images per request, results streamed back as NDJSON per chunk
+    if request.files:
+        # read now: the uploads are closed before the streamed response runs
+        images = [f.read() for f in request.files.getlist("files") + request.files.getlist("file")]
+
+    elif request.is_json:
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get("images")
+        if not isinstance(data, list):
+            return jsonify({"error": "Expected a JSON array of base64 images"}), 400
+        images = []
+        for index, imgstring in enumerate(data):
+            try:
+                images.append(decode_image(imgstring=imgstring))
+            except Exception:
+                return jsonify({"error": f"Invalid base64 image at index {index}"}), 400
+
+    else:
+        return jsonify({"error": "Unsupported request"}), 400
+
+    unavailable = model_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    # one model version for the whole batch, even if a swap lands mid-stream
+    served = clApp.active
+
+    def generate():
+        try:
+            for results in served.classifier.predict_chunks(
+                images, chunk_size=clApp.serving_config.batch_chunk_size
+            ):
+                for result in results:
+                    yield json.dumps(result) + "\n"
+        except Exception as e:
+            print(f"ERROR DURING BATCH PREDICTION: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8080, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=8080, debug=True, threaded=True)
\ No newline at end of file
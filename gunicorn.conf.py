@@ -0,0 +1,27 @@
+# Pre-fork production server: gunicorn -c gunicorn.conf.py app:app
+import os
+import sys
+
+sys.path.insert(0, "src")
+from classifier.config.configuration import ConfigurationManager
+
+# app.py reads this to load the model in the master instead of a thread
+os.environ["CLASSIFIER_PREFORK"] = "1"
+
+serving_config = ConfigurationManager().get_serving_config()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+preload_app = True
+# only the TFLite backends share their weights across workers, a Keras
+# worker holds its own copy of the model, so it gets one worker by default
+workers = serving_config.workers or (1 if serving_config.backend == "keras" else os.cpu_count())
+worker_class = "gthread"
+threads = serving_config.worker_threads
+timeout = 300
+
+
+def post_fork(server, worker):
+    # returns at once, the worker loads and warms its model on a thread
+    import app
+    if app.clApp is not None:
+        app.clApp.start_worker()
@@ -1,58 +1,20 @@
-from classifier import logger
-from classifier.config.configuration import ConfigurationManager
-from classifier.pipeline.stage_01_data_ingestion import DataIngestionPipeline
-from classifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelPipeline
-from classifier.pipeline.stage_03_prepare_callbacks import PrepareCallbacksPipeline
-from classifier.pipeline.stage_04_training import ModelTrainingPipeline
-from classifier.pipeline.stage_05_evaluation import EvaluationPipeline
+import argparse
+from classifier.pipeline.runner import StageRunner
 
 
-STAGE_NAME = "Data Ingestion Stage"
-try:
-    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-    pipeline = DataIngestionPipeline()
-    pipeline.main()
-    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-    logger.exception(e)
-    raise e 
+parser = argparse.ArgumentParser(description="Runs the pipeline, skipping stages whose outputs are up to date")
+parser.add_argument("--stage", help="run only this stage")
+parser.add_argument("--from", dest="start", help="first stage of the range to run")
+parser.add_argument("--to", dest="end", help="last stage of the range to run")
+parser.add_argument("--force", action="store_true", help="run the selected stages even if up to date")
+parser.add_argument("--in-memory", action="store_true", help="pass the live model between stages and save artifacts in the background")
+parser.add_argument("--list", action="store_true", help="list the stages and whether they are up to date")
+args = parser.parse_args()
 
-STAGE_NAME = "Prepare Base Model Stage"
-try:
-    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-    pipeline = PrepareBaseModelPipeline()
-    pipeline.main()
-    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-STAGE_NAME = "Prepare Callbacks Stage"
-try:
-    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-    pipeline = PrepareCallbacksPipeline()
-    pipeline.main()
-    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-STAGE_NAME = "Training Stage"
-try:
-    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-    pipeline = ModelTrainingPipeline()
-    pipeline.main()
-    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-STAGE_NAME = "Evaluation Stage"
-try:
-    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-    pipeline = EvaluationPipeline()
-    pipeline.main()
-    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-    logger.exception(e)
-    raise e
\ No newline at end of file
+runner = StageRunner()
+if args.list:
+    for stage in runner.stages:
+        state = "up to date" if runner.is_up_to_date(stage, runner.fingerprint(stage)) else "stale"
+        print(f"{stage.name:<20} {state}")
+else:
+    runner.run(stage=args.stage, start=args.start, end=args.end, force=args.force, in_memory=args.in_memory)
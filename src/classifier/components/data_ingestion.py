@@ -1,40 +1,232 @@
 import os
+import json
+import shutil
+import hashlib
+import threading
 import urllib.request as request
 import zipfile
 from classifier import logger
 from classifier.utils.common import get_size
 from classifier.entity.config_entity import DataIngestionConfig
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import gdown
 
+# CRCs of the members written by the last incremental extraction
+MANIFEST_NAME = ".zip_manifest.json"
+
 class DataIngestion:
     def __init__(self, config: DataIngestionConfig):
         self.config = config
 
     def download_data(self) -> Path:
-        if not os.path.exists(self.config.local_data_file):
-
-            url = self.config.source_URL
+        local_data_file = Path(self.config.local_data_file)
+        if local_data_file.exists():
+            if self.verify_checksum(local_data_file):
+                logger.info(f"File already exists of size: {get_size(local_data_file)}")
+                return self.config.local_data_file
+            logger.warning(f"Checksum mismatch, downloading {local_data_file} again")
+            local_data_file.unlink()
 
-            # if it is a google drive link, download using gdown
-            if "drive.google.com" in url:
-                gdown.download(url, str(self.config.local_data_file), quiet=False)
-                logger.info(f"Downloaded from Google Drive: {self.config.local_data_file}")
-            else:
-                filename, headers = request.urlretrieve(
-                    url, self.config.local_data_file
-                )
-                logger.info(f"File: {filename} downloaded with info: \n{headers}")
+        # everything lands in a .part file first, so an interrupted download
+        # is resumed next run instead of being mistaken for a complete one
+        part_file = Path(f"{local_data_file}.part")
+        url = self.config.source_URL
 
+        # if it is a google drive link, download using gdown
+        if "drive.google.com" in url:
+            # gdown keeps the bytes received so far in a temporary .part file
+            # next to part_file and continues from it on the next run
+            gdown.download(url, str(part_file), quiet=False, resume=True)
+            logger.info(f"Downloaded from Google Drive: {part_file}")
         else:
-            logger.info(
-                f"File already exists of size: {get_size(Path(self.config.local_data_file))}"
-            )
+            self.download_in_chunks(url, part_file)
 
+        if not self.verify_checksum(part_file):
+            part_file.unlink()
+            raise ValueError(f"Checksum mismatch for download from {url}")
+
+        os.replace(part_file, local_data_file)
+        logger.info(f"File: {local_data_file} downloaded, size: {get_size(local_data_file)}")
         return self.config.local_data_file
 
+    def verify_checksum(self, path: Path) -> bool:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+
+        if not self.config.sha256:
+            logger.warning(f"No sha256 configured for {path}, computed: {digest.hexdigest()}")
+            return True
+        return digest.hexdigest() == self.config.sha256.lower()
+
+    def download_in_chunks(self, url: str, part_file: Path) -> None:
+        """
+        Downloads `url` with parallel HTTP range requests into `part_file`.
+
+        Finished chunks are recorded in a sidecar state file, so a rerun after
+        an interruption only fetches the missing ones. Servers without range
+        support fall back to a single stream.
+        """
+        with request.urlopen(request.Request(url, method="HEAD")) as response:
+            size = int(response.headers.get("Content-Length") or 0)
+            ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+
+        if not (size and ranges):
+            with request.urlopen(url) as response, open(part_file, "wb") as f:
+                shutil.copyfileobj(response, f, 1024 * 1024)
+            return
+
+        chunk_size = self.config.download_chunk_mb * 1024 * 1024
+        chunks = [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+        state_file = Path(f"{part_file}.json")
+        done = set()
+        if part_file.exists() and state_file.exists():
+            with open(state_file) as f:
+                state = json.load(f)
+            if state.get("url") == url and state.get("size") == size:
+                done = set(state["done"])
+        if not done:
+            with open(part_file, "wb") as f:
+                f.truncate(size)
+
+        lock = threading.Lock()
+
+        def fetch(chunk):
+            start, end = chunk
+            req = request.Request(url, headers={"Range": f"bytes={start}-{end}"})
+            with request.urlopen(req) as response:
+                data = response.read()
+            if len(data) != end - start + 1:
+                raise IOError(f"Short read for bytes {start}-{end} of {url}")
+            with open(part_file, "r+b") as f:
+                f.seek(start)
+                f.write(data)
+            with lock:
+                done.add(start)
+                with open(state_file, "w") as f:
+                    json.dump({"url": url, "size": size, "done": sorted(done)}, f)
+
+        pending = [chunk for chunk in chunks if chunk[0] not in done]
+        logger.info(f"Downloading {len(pending)} of {len(chunks)} chunks from {url}")
+        with ThreadPoolExecutor(max_workers=self.config.download_workers) as executor:
+            list(executor.map(fetch, pending))
+        state_file.unlink()
+
     def extract_zip_file(self) -> None:
         unzip_path = self.config.unzip_dir
-        os.makedirs(unzip_path, exist_ok=True)  
+        os.makedirs(unzip_path, exist_ok=True)
+
+        if self.config.extract_mode == "stream":
+            # images are decoded straight from data.zip (DATA_PIPELINE: packed)
+            logger.info("Extraction skipped, dataset is read from the zip archive")
+            return
+        if self.config.extract_mode == "incremental":
+            return self.extract_changed_members()
+
         with zipfile.ZipFile(self.config.local_data_file, "r") as zip_ref:
-            zip_ref.extractall(unzip_path)
\ No newline at end of file
+            zip_ref.extractall(unzip_path)
+
+    def extract_changed_members(self) -> None:
+        """
+        Extracts only the members whose CRC differs from the manifest of the last
+        extraction (or whose file is missing), and removes members that left the zip.
+        """
+        unzip_path = Path(self.config.unzip_dir)
+        manifest_path = unzip_path / MANIFEST_NAME
+        manifest = {}
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        extracted = 0
+        with zipfile.ZipFile(self.config.local_data_file, "r") as zip_ref:
+            members = [info for info in zip_ref.infolist() if not info.is_dir()]
+            current = {info.filename: info.CRC for info in members}
+
+            for info in members:
+                target = unzip_path / info.filename
+                if (
+                    manifest.get(info.filename) == info.CRC
+                    and target.exists()
+                    and target.stat().st_size == info.file_size
+                ):
+                    continue
+                zip_ref.extract(info, unzip_path)
+                extracted += 1
+
+        removed = 0
+        for name in set(manifest) - set(current):
+            stale = unzip_path / name
+            if stale.exists():
+                stale.unlink()
+                removed += 1
+
+        with open(manifest_path, "w") as f:
+            json.dump(current, f)
+        logger.info(
+            f"Incremental extraction: {extracted} written, {removed} removed, "
+            f"{len(current) - extracted} unchanged"
+        )
+
+
+class ZipImageReader:
+    """
+    Reads dataset images straight out of data.zip without extracting it.
+
+    ZipFile handles are not safe to share between threads, so each worker
+    thread opens its own, and members are read in parallel through `read_all`.
+    """
+
+    def __init__(self, zip_path: Path, prefix: str, workers: int = 4):
+        self.zip_path = Path(zip_path)
+        self.prefix = prefix.strip("/") + "/"
+        self.workers = workers
+        self._local = threading.local()
+
+    def _handle(self) -> zipfile.ZipFile:
+        if not hasattr(self._local, "zip_ref"):
+            self._local.zip_ref = zipfile.ZipFile(self.zip_path, "r")
+        return self._local.zip_ref
+
+    def list_members(self, extensions: tuple):
+        """
+        Lists image members in class-major, sorted order like DataLoader.
+
+        Returns:
+            tuple: (member names, their CRCs, class indices dict, per-member class names).
+        """
+        by_class = {}
+        crcs = {}
+        with zipfile.ZipFile(self.zip_path, "r") as zip_ref:
+            for info in zip_ref.infolist():
+                name = info.filename
+                if info.is_dir() or not name.startswith(self.prefix):
+                    continue
+                parts = name[len(self.prefix):].split("/")
+                if len(parts) < 2 or not name.lower().endswith(extensions):
+                    continue
+                by_class.setdefault(parts[0], []).append(name)
+                crcs[name] = info.CRC
+
+        class_names = sorted(by_class)
+        members, member_classes = [], []
+        for class_name in class_names:
+            for name in sorted(by_class[class_name]):
+                members.append(name)
+                member_classes.append(class_name)
+        class_indices = {name: index for index, name in enumerate(class_names)}
+        return members, [crcs[name] for name in members], class_indices, member_classes
+
+    def read(self, name: str) -> bytes:
+        return self._handle().read(name)
+
+    def read_all(self, names):
+        # zlib releases the GIL, so decompression overlaps across threads; a
+        # bounded window keeps only a few members' bytes in memory at a time
+        window = self.workers * 16
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for start in range(0, len(names), window):
+                yield from executor.map(self.read, names[start:start + window])
\ No newline at end of file
@@ -0,0 +1,250 @@
+import os
+import json
+import math
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+WHITE_LIST_FORMATS = (".png", ".jpg", ".jpeg", ".bmp", ".ppm", ".tif", ".tiff")
+
+# fraction of each class held out for validation, shared by training and evaluation
+VALIDATION_SPLIT = 0.20
+
+
+class ImageDataset:
+    """
+    A batched tf.data pipeline plus the bookkeeping Training and Evaluation
+    read from Keras' DirectoryIterator (samples, batch_size, class_indices).
+    """
+
+    def __init__(self, dataset: tf.data.Dataset, samples: int, batch_size: int, class_indices: dict):
+        self.dataset = dataset
+        self.samples = samples
+        self.batch_size = batch_size
+        self.class_indices = class_indices
+
+    @property
+    def num_classes(self):
+        return len(self.class_indices)
+
+    def __len__(self):
+        return math.ceil(self.samples / self.batch_size)
+
+
+def iterate_batches(generator):
+    """One pass over either a tf.data ImageDataset or a Keras iterator."""
+    if hasattr(generator, "dataset"):
+        yield from generator.dataset.as_numpy_iterator()
+    else:
+        for step in range(len(generator)):
+            yield generator[step]
+
+
+def random_shear(images, max_degrees, seed=None):
+    """
+    Shears a batch of images by a random angle in [-max_degrees, max_degrees]
+    about their centre, like ImageDataGenerator's shear_range.
+    """
+    shape = tf.shape(images)
+    batch_size = shape[0]
+    height = tf.cast(shape[1], tf.float32)
+
+    angles = tf.random.uniform([batch_size], -max_degrees, max_degrees, seed=seed) * (math.pi / 180.0)
+    sin, cos = tf.sin(angles), tf.cos(angles)
+    zeros, ones = tf.zeros_like(angles), tf.ones_like(angles)
+    centre_y = (height - 1.0) / 2.0
+
+    # maps each output pixel (x, y) to the input pixel it is sampled from
+    transforms = tf.stack(
+        [ones, -sin, sin * centre_y, zeros, cos, (1.0 - cos) * centre_y, zeros, zeros],
+        axis=1
+    )
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST"
+    )
+
+
+def decode_and_resize(data, image_size):
+    """Decodes encoded image bytes to RGB and resizes them bilinearly (0-255 floats)."""
+    image = tf.io.decode_image(data, channels=3, expand_animations=False)
+    return tf.image.resize(image, image_size, method="bilinear")
+
+
+def augmentation():
+    # same ranges as the ImageDataGenerator settings in Training
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomRotation(40 / 360, fill_mode="nearest"),
+        tf.keras.layers.RandomTranslation(0.2, 0.2, fill_mode="nearest"),
+        tf.keras.layers.RandomZoom((-0.2, 0.2), (-0.2, 0.2), fill_mode="nearest"),
+        tf.keras.layers.RandomFlip("horizontal"),
+    ])
+
+
+def rescale(images):
+    return images / 255.0
+
+
+def prepare_batches(dataset: tf.data.Dataset, augment: bool, preprocess=rescale) -> tf.data.Dataset:
+    """Augments (optionally), preprocesses (/255 by default) and prefetches batches of 0-255 images."""
+    dataset = dataset.map(
+        lambda images, y: (tf.cast(images, tf.float32), y),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    if augment:
+        layers = augmentation()
+        dataset = dataset.map(
+            lambda images, y: (random_shear(layers(images, training=True), 0.2), y),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+
+    return dataset.map(
+        lambda images, y: (preprocess(images), y),
+        num_parallel_calls=tf.data.AUTOTUNE
+    ).prefetch(tf.data.AUTOTUNE)
+
+
+class DataLoader:
+    """
+    tf.data replacement for ImageDataGenerator.flow_from_directory.
+
+    Decoding and resizing run in parallel, augmentation runs on whole batches,
+    and batches are prefetched. The train/validation split follows Keras'
+    rule so both loaders see the same files in each subset.
+    """
+
+    def __init__(self, directory: Path, image_size: list, batch_size: int, validation_split: float):
+        self.directory = Path(directory)
+        self.image_size = list(image_size[:2])
+        self.batch_size = batch_size
+        self.validation_split = validation_split
+        self.class_names = sorted(
+            entry.name for entry in os.scandir(self.directory) if entry.is_dir()
+        )
+        self.class_indices = {name: index for index, name in enumerate(self.class_names)}
+
+    def list_subset(self, subset: str):
+        """
+        Lists the files of one subset ("training" or "validation", None for all).
+
+        Returns:
+            tuple: (list of file paths, np.ndarray of class indices).
+        """
+        paths, labels = [], []
+        for name in self.class_names:
+            class_dir = self.directory / name
+            files = [
+                os.path.join(root, file)
+                for root, _, filenames in sorted(os.walk(class_dir))
+                for file in sorted(filenames)
+                if file.lower().endswith(WHITE_LIST_FORMATS)
+            ]
+            # ImageDataGenerator takes the first fraction of each class as validation
+            split_at = int(self.validation_split * len(files))
+            if subset == "validation":
+                files = files[:split_at]
+            elif subset == "training":
+                files = files[split_at:]
+            paths.extend(files)
+            labels.extend([self.class_indices[name]] * len(files))
+        return paths, np.asarray(labels, dtype="int32")
+
+    def _decode(self, path, label):
+        image = decode_and_resize(tf.io.read_file(path), self.image_size)
+        return image, tf.one_hot(label, len(self.class_names))
+
+    def load(self, subset: str, shuffle=False, augment=False, cache=False, preprocess=rescale) -> ImageDataset:
+        paths, labels = self.list_subset(subset)
+        dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+        if shuffle:
+            dataset = dataset.shuffle(len(paths), reshuffle_each_iteration=True)
+
+        dataset = dataset.map(self._decode, num_parallel_calls=tf.data.AUTOTUNE)
+        if cache:
+            # decoded and resized once, reused every epoch
+            dataset = dataset.cache()
+        dataset = prepare_batches(dataset.batch(self.batch_size), augment, preprocess)
+
+        return ImageDataset(
+            dataset=dataset,
+            samples=len(paths),
+            batch_size=self.batch_size,
+            class_indices=self.class_indices
+        )
+
+
+class PackedDataLoader:
+    """
+    Reads the uint8 shards written by DatasetPacking through memory maps, so
+    no JPEG is decoded and only the batches in flight are paged in.
+    """
+
+    def __init__(self, packed_dir: Path, batch_size: int, validation_split: float):
+        self.packed_dir = Path(packed_dir)
+        self.batch_size = batch_size
+        self.validation_split = validation_split
+
+        with open(self.packed_dir / "index.json") as f:
+            index = json.load(f)
+        self.class_indices = index["class_indices"]
+        self.shard_size = index["shard_size"]
+        self.labels = np.load(self.packed_dir / index["labels"])
+        self.shards = [
+            np.load(self.packed_dir / shard["file"], mmap_mode="r")
+            for shard in index["shards"]
+        ]
+        self.image_shape = self.shards[0].shape[1:]
+
+    def list_subset(self, subset: str) -> np.ndarray:
+        """Sample indices of one subset, split per class the way DataLoader does."""
+        indices = []
+        for label in range(len(self.class_indices)):
+            members = np.flatnonzero(self.labels == label)
+            split_at = int(self.validation_split * len(members))
+            if subset == "validation":
+                members = members[:split_at]
+            elif subset == "training":
+                members = members[split_at:]
+            indices.append(members)
+        return np.concatenate(indices)
+
+    def gather(self, indices: np.ndarray) -> np.ndarray:
+        images = np.empty((len(indices), *self.image_shape), dtype="uint8")
+        shard_numbers, offsets = np.divmod(indices, self.shard_size)
+        for shard_number in np.unique(shard_numbers):
+            rows = shard_numbers == shard_number
+            images[rows] = self.shards[shard_number][offsets[rows]]
+        return images
+
+    def load(self, subset: str, shuffle=False, augment=False, cache=False, preprocess=rescale) -> ImageDataset:
+        indices = self.list_subset(subset)
+        num_classes = len(self.class_indices)
+
+        def batches():
+            order = np.random.permutation(indices) if shuffle else indices
+            for start in range(0, len(order), self.batch_size):
+                # sorted so each batch reads its shards front to back
+                batch = np.sort(order[start:start + self.batch_size])
+                labels = np.eye(num_classes, dtype="float32")[self.labels[batch]]
+                yield self.gather(batch), labels
+
+        dataset = tf.data.Dataset.from_generator(
+            batches,
+            output_signature=(
+                tf.TensorSpec((None, *self.image_shape), tf.uint8),
+                tf.TensorSpec((None, num_classes), tf.float32)
+            )
+        )
+        if cache:
+            dataset = dataset.cache()
+
+        return ImageDataset(
+            dataset=prepare_batches(dataset, augment, preprocess),
+            samples=len(indices),
+            batch_size=self.batch_size,
+            class_indices=self.class_indices
+        )
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from classifier import logger
+from classifier.components.data_loader import DataLoader, decode_and_resize, WHITE_LIST_FORMATS
+from classifier.components.data_ingestion import ZipImageReader
+from classifier.entity.config_entity import DatasetPackingConfig
+
+
+class DatasetPacking:
+    """
+    Decodes and resizes the dataset once into uint8 .npy shards.
+
+    `index.json` records the class indices, the label file and each shard's
+    size. Samples keep DataLoader's class-major, sorted order, so the
+    train/validation split can be recomputed from the labels alone. With
+    extract_mode "stream" the images come straight out of data.zip.
+    """
+
+    def __init__(self, config: DatasetPackingConfig):
+        self.config = config
+        self.index_path = Path(self.config.packed_dir) / "index.json"
+
+    def _directory_source(self):
+        loader = DataLoader(
+            directory=self.config.source_dir,
+            image_size=self.config.params_image_size,
+            batch_size=self.config.shard_size,
+            validation_split=0.0
+        )
+        paths, labels = loader.list_subset(None)
+
+        digest = hashlib.sha256(json.dumps(self.config.params_image_size).encode())
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, self.config.source_dir)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+        encoded = tf.data.Dataset.from_tensor_slices(paths).map(
+            tf.io.read_file, num_parallel_calls=tf.data.AUTOTUNE
+        )
+        return encoded, labels, loader.class_indices, digest.hexdigest()
+
+    def _zip_source(self):
+        reader = ZipImageReader(
+            zip_path=self.config.local_data_file,
+            prefix=Path(self.config.source_dir).name,
+            workers=self.config.read_workers
+        )
+        members, crcs, class_indices, member_classes = reader.list_members(WHITE_LIST_FORMATS)
+        labels = np.asarray([class_indices[name] for name in member_classes], dtype="int32")
+
+        digest = hashlib.sha256(json.dumps(self.config.params_image_size).encode())
+        for name, crc in zip(members, crcs):
+            digest.update(f"{name}:{crc}".encode())
+
+        encoded = tf.data.Dataset.from_generator(
+            lambda: reader.read_all(members),
+            output_signature=tf.TensorSpec((), tf.string)
+        )
+        return encoded, labels, class_indices, digest.hexdigest()
+
+    def is_up_to_date(self, fingerprint: str) -> bool:
+        if not self.index_path.exists():
+            return False
+        with open(self.index_path) as f:
+            return json.load(f).get("fingerprint") == fingerprint
+
+    def pack(self):
+        if self.config.extract_mode == "stream":
+            encoded, labels, class_indices, fingerprint = self._zip_source()
+        else:
+            encoded, labels, class_indices, fingerprint = self._directory_source()
+
+        if self.is_up_to_date(fingerprint):
+            logger.info(f"Packed dataset at {self.config.packed_dir} is up to date")
+            return
+
+        packed_dir = Path(self.config.packed_dir)
+        packed_dir.mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            self.index_path.unlink()
+
+        # parallel decode + resize, one batch per shard, stored as uint8
+        image_size = list(self.config.params_image_size[:2])
+        dataset = encoded.map(
+            lambda data: decode_and_resize(data, image_size),
+            num_parallel_calls=tf.data.AUTOTUNE
+        ).batch(self.config.shard_size).prefetch(tf.data.AUTOTUNE)
+
+        shards = []
+        for number, images in enumerate(dataset.as_numpy_iterator()):
+            name = f"shard_{number:05d}.npy"
+            np.save(packed_dir / name, np.clip(np.round(images), 0, 255).astype("uint8"))
+            shards.append({"file": name, "count": int(len(images))})
+
+        np.save(packed_dir / "labels.npy", labels)
+        index = {
+            "fingerprint": fingerprint,
+            "image_size": image_size,
+            "class_indices": class_indices,
+            "labels": "labels.npy",
+            "shard_size": self.config.shard_size,
+            "shards": shards
+        }
+        # written last so a half-packed directory is never taken as complete
+        with open(self.index_path, "w") as f:
+            json.dump(index, f, indent=4)
+        logger.info(f"Packed {len(labels)} images into {len(shards)} shards at: {packed_dir}")
@@ -0,0 +1,146 @@
+import tensorflow as tf
+from classifier import logger
+from classifier.entity.config_entity import DistillationConfig
+from classifier.components.data_loader import DataLoader, PackedDataLoader, VALIDATION_SPLIT
+from classifier.utils.backbones import get_preprocessing, load_metadata, persist_model
+
+STUDENT_BACKBONE = "StudentCNN"
+
+
+def build_student(input_shape: list, filters: list, classes: int) -> tf.keras.Model:
+    """
+    A small CNN: one conv / batch norm / max pool block per entry of `filters`,
+    global average pooling and the softmax classifier.
+
+    The output layer is named "head_dense" like the base model's, so
+    apply_precision keeps it float32 and Evaluation reports the head.
+    """
+    inputs = tf.keras.Input(shape=input_shape)
+    x = inputs
+    for block, units in enumerate(filters, start=1):
+        x = tf.keras.layers.Conv2D(units, 3, padding="same", use_bias=False, name=f"block{block}_conv")(x)
+        x = tf.keras.layers.BatchNormalization(name=f"block{block}_bn")(x)
+        x = tf.keras.layers.ReLU(name=f"block{block}_relu")(x)
+        x = tf.keras.layers.MaxPooling2D(name=f"block{block}_pool")(x)
+    x = tf.keras.layers.GlobalAveragePooling2D(name="head_gap")(x)
+    outputs = tf.keras.layers.Dense(classes, activation="softmax", name="head_dense", dtype="float32")(x)
+    return tf.keras.Model(inputs=inputs, outputs=outputs, name="student")
+
+
+class Distiller(tf.keras.Model):
+    """
+    Trains `student` on a blend of the teacher's softened predictions and the
+    hard labels (Hinton et al., 2015):
+
+        loss = alpha * T^2 * KL(teacher_T || student_T) + (1 - alpha) * CE(labels, student)
+
+    Both models end in a softmax, so the temperature is applied to the log
+    probabilities, which equal the logits up to a per-row constant. Only the
+    student is trained and saved; the teacher runs in inference mode.
+    """
+
+    def __init__(self, student: tf.keras.Model, teacher: tf.keras.Model, temperature: float, alpha: float):
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        self.teacher.trainable = False
+        self.temperature = temperature
+        self.alpha = alpha
+        self.soft_loss = tf.keras.losses.KLDivergence()
+        self.hard_loss = tf.keras.losses.CategoricalCrossentropy()
+
+    def call(self, x, training=False):
+        return self.student(x, training=training)
+
+    def _soften(self, probs):
+        logits = tf.math.log(tf.clip_by_value(tf.cast(probs, tf.float32), 1e-7, 1.0))
+        return tf.nn.softmax(logits / self.temperature)
+
+    def compute_loss(self, x=None, y=None, y_pred=None, sample_weight=None, training=True):
+        teacher_probs = self.teacher(x, training=False)
+        soft_loss = self.soft_loss(self._soften(teacher_probs), self._soften(y_pred))
+        hard_loss = self.hard_loss(y, y_pred)
+        # T^2 keeps the soft gradients on the scale of the hard ones
+        return self.alpha * self.temperature ** 2 * soft_loss + (1 - self.alpha) * hard_loss
+
+
+class Distillation:
+    def __init__(self, config: DistillationConfig, writer=None):
+        self.config = config
+        self.writer = writer
+        # the student reads the teacher's inputs, so both share one pipeline
+        self.metadata = load_metadata(self.config.teacher_model_path)
+        self.preprocess = get_preprocessing(self.config.teacher_model_path)
+
+    def get_teacher(self, model: tf.keras.Model = None):
+        # the live model handed over by the training stage, or the saved one
+        self.teacher = model if model is not None else tf.keras.models.load_model(
+            self.config.teacher_model_path, compile=False
+        )
+
+    def get_student(self):
+        self.student = build_student(
+            input_shape=self.config.params_image_size,
+            filters=self.config.params_student_filters,
+            classes=self.config.params_classes
+        )
+        logger.info(
+            f"Student: {self.student.count_params():,} parameters, "
+            f"teacher: {self.teacher.count_params():,}"
+        )
+
+    def train_valid_dataset(self, train_generator=None, valid_generator=None):
+        # tf.data datasets handed over by the training stage are reused as is,
+        # they share IMAGE_SIZE, BATCH_SIZE, AUGMENTATION and the preprocessing
+        if hasattr(train_generator, "dataset") and hasattr(valid_generator, "dataset"):
+            self.train_generator, self.valid_generator = train_generator, valid_generator
+            return
+
+        # the keras_generator pipeline reads the JPEGs through tf.data here
+        if self.config.params_data_pipeline == "packed":
+            loader = PackedDataLoader(
+                packed_dir=self.config.packed_data,
+                batch_size=self.config.params_batch_size,
+                validation_split=VALIDATION_SPLIT
+            )
+        else:
+            loader = DataLoader(
+                directory=self.config.training_data,
+                image_size=self.config.params_image_size,
+                batch_size=self.config.params_batch_size,
+                validation_split=VALIDATION_SPLIT
+            )
+        self.valid_generator = loader.load("validation", cache=True, preprocess=self.preprocess)
+        self.train_generator = loader.load(
+            "training", shuffle=True, augment=self.config.params_is_augmentation,
+            preprocess=self.preprocess
+        )
+
+    def train(self):
+        distiller = Distiller(
+            student=self.student,
+            teacher=self.teacher,
+            temperature=self.config.params_temperature,
+            alpha=self.config.params_alpha
+        )
+        distiller.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=self.config.params_learning_rate),
+            metrics=["accuracy"]
+        )
+        # one full pass over the finite datasets per epoch
+        distiller.fit(
+            self.train_generator.dataset,
+            epochs=self.config.params_epochs,
+            validation_data=self.valid_generator.dataset
+        )
+
+        # compiled like the trained model, so the artifact loads the same way
+        self.student.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=self.config.params_learning_rate),
+            loss=tf.keras.losses.CategoricalCrossentropy(),
+            metrics=["accuracy"]
+        )
+        persist_model(
+            self.config.student_model_path, self.student,
+            {**self.metadata, "backbone": STUDENT_BACKBONE}, writer=self.writer
+        )
@@ -1,50 +1,250 @@
-from classifier.utils.common import save_json
-from urllib.parse import urlparse
+import os
+import time
+import numpy as np
+from classifier import logger
+from classifier.utils.common import save_json, get_size
 from classifier.entity.config_entity import EvaluationConfig
+from classifier.components.data_loader import (
+    DataLoader, PackedDataLoader, decode_and_resize, iterate_batches, VALIDATION_SPLIT
+)
+from classifier.utils.precision import apply_precision
+from classifier.utils.backbones import get_preprocessing
 import tensorflow as tf
 from pathlib import Path
 
+# single-image forward passes timed for the per-image latency
+SINGLE_IMAGE_RUNS = 50
+
 class Evaluation:
-    def __init__(self, config: EvaluationConfig):
+    """
+    Scores a model on the validation split Training holds out.
+
+    The split is decoded once into a uint8 array (read straight from the
+    packed shards when DATA_PIPELINE is "packed"), scored in large batches,
+    and every metric comes from one vectorized pass over the stored
+    predictions. Forward-pass timings are recorded alongside.
+    """
+
+    def __init__(self, config: EvaluationConfig, writer=None):
         self.config = config
+        # an ArtifactWriter may still be saving the model during in-process runs
+        self.writer = writer
+        self.preprocess = get_preprocessing(self.config.path_of_model)
+        self.preprocessed = False
 
-    
-    def _valid_generator(self):
 
-        datagenerator_kwargs = dict(
-            rescale = 1./255,
-            validation_split=0.30
-        )
+    def _from_generator(self, valid_generator) -> bool:
+        """Takes over the validation split the training stage decoded and preprocessed."""
+        batches = list(iterate_batches(valid_generator))
+        if any(images.shape[1:] != tuple(self.config.params_image_size) for images, _ in batches):
+            logger.warning("Validation data of the training stage does not match IMAGE_SIZE, reading it again")
+            return False
+        self.images = np.concatenate([images for images, _ in batches]).astype("float32")
+        self.labels = np.concatenate([np.argmax(labels, axis=1) for _, labels in batches])
+        return True
 
-        dataflow_kwargs = dict(
-            target_size=self.config.params_image_size[:-1],
-            batch_size=self.config.params_batch_size,
-            interpolation="bilinear"
-        )
+    def _validation_set(self, valid_generator=None):
+        batch_size = self.config.params_eval_batch_size
+        # images already run through self.preprocess
+        self.preprocessed = valid_generator is not None and self._from_generator(valid_generator)
+        if self.preprocessed:
+            loader = valid_generator
+        elif self.config.params_data_pipeline == "packed":
+            loader = PackedDataLoader(
+                packed_dir=self.config.packed_data,
+                batch_size=batch_size,
+                validation_split=VALIDATION_SPLIT
+            )
+            indices = loader.list_subset("validation")
+            self.images = loader.gather(indices)
+            self.labels = loader.labels[indices]
+        else:
+            loader = DataLoader(
+                directory=self.config.training_data,
+                image_size=self.config.params_image_size,
+                batch_size=batch_size,
+                validation_split=VALIDATION_SPLIT
+            )
+            paths, self.labels = loader.list_subset("validation")
+            # decoded and resized in parallel, kept as uint8 like the packed shards
+            dataset = tf.data.Dataset.from_tensor_slices(paths).map(
+                lambda path: decode_and_resize(tf.io.read_file(path), loader.image_size),
+                num_parallel_calls=tf.data.AUTOTUNE
+            ).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+            self.images = np.concatenate([
+                np.clip(np.round(images), 0, 255).astype("uint8")
+                for images in dataset.as_numpy_iterator()
+            ])
 
-        valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
-            **datagenerator_kwargs
-        )
+        self.class_names = sorted(loader.class_indices, key=loader.class_indices.get)
+        logger.info(f"Validation set: {len(self.labels)} images, classes: {self.class_names}")
 
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="validation",
-            shuffle=False,
-            **dataflow_kwargs
-        )
 
-    
     @staticmethod
     def load_model(path: Path) -> tf.keras.Model:
         return tf.keras.models.load_model(path)
-    
 
-    def evaluation(self):
-        self.model = self.load_model(self.config.path_of_model)
-        self._valid_generator()
-        self.score = self.model.evaluate(self.valid_generator)
+    def _preprocess(self, images: np.ndarray) -> np.ndarray:
+        if self.preprocessed:
+            return images
+        return np.asarray(self.preprocess(images.astype("float32")), dtype="float32")
+
+    def _predict(self, model: tf.keras.Model):
+        """
+        Runs the validation set through the model in eval-sized batches.
+
+        Returns:
+            tuple: (np.ndarray of class probabilities, np.ndarray of
+                per-batch forward-pass latencies in seconds, np.ndarray of
+                single-image latencies in seconds).
+        """
+        batch_size = self.config.params_eval_batch_size
+        infer = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[tf.TensorSpec([None, *self.images.shape[1:]], tf.float32)]
+        )
+        # traced outside the timed loop
+        infer(self._preprocess(self.images[:batch_size]))
+
+        probs, latencies = [], []
+        for start in range(0, len(self.images), batch_size):
+            batch = self._preprocess(self.images[start:start + batch_size])
+            begin = time.perf_counter()
+            probs.append(np.asarray(infer(batch), dtype="float32"))
+            latencies.append(time.perf_counter() - begin)
+
+        # one image per call, the way /predict serves it
+        single_latencies = []
+        for index in range(min(SINGLE_IMAGE_RUNS, len(self.images))):
+            image = self._preprocess(self.images[index:index + 1])
+            begin = time.perf_counter()
+            np.asarray(infer(image))
+            single_latencies.append(time.perf_counter() - begin)
+        return np.concatenate(probs), np.asarray(latencies), np.asarray(single_latencies)
+
+    def _metrics(self, probs: np.ndarray) -> dict:
+        num_classes = len(self.class_names)
+        predictions = np.argmax(probs, axis=1)
+
+        # rows are true classes, columns predicted ones
+        confusion = np.bincount(
+            self.labels * num_classes + predictions, minlength=num_classes * num_classes
+        ).reshape(num_classes, num_classes)
+        true_positives = np.diag(confusion)
+        predicted = confusion.sum(axis=0)
+        support = confusion.sum(axis=1)
+        precision = np.divide(true_positives, predicted, out=np.zeros(num_classes), where=predicted > 0)
+        recall = np.divide(true_positives, support, out=np.zeros(num_classes), where=support > 0)
+        f1 = np.divide(
+            2 * precision * recall, precision + recall,
+            out=np.zeros(num_classes), where=(precision + recall) > 0
+        )
+
+        true_probs = probs[np.arange(len(self.labels)), self.labels]
+        return {
+            "loss": float(-np.mean(np.log(np.clip(true_probs, 1e-7, 1.0)))),
+            "accuracy": float(true_positives.sum() / len(self.labels)),
+            "per_class": {
+                name: {
+                    "precision": float(precision[i]),
+                    "recall": float(recall[i]),
+                    "f1": float(f1[i]),
+                    "support": int(support[i])
+                }
+                for i, name in enumerate(self.class_names)
+            },
+            "confusion_matrix": confusion.tolist()
+        }
+
+    @staticmethod
+    def _distribution(latencies_ms: np.ndarray) -> dict:
+        p50, p90, p99 = np.percentile(latencies_ms, [50, 90, 99])
+        return {
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "mean": float(latencies_ms.mean()),
+            "max": float(latencies_ms.max())
+        }
+
+    def _performance(self, latencies: np.ndarray, single_latencies: np.ndarray) -> dict:
+        batch_ms = latencies * 1000
+        return {
+            "images": int(len(self.labels)),
+            "batch_size": self.config.params_eval_batch_size,
+            "images_per_sec": float(len(self.labels) / latencies.sum()),
+            "per_image_ms": float(batch_ms.sum() / len(self.labels)),
+            "batch_latency_ms": self._distribution(batch_ms),
+            "single_image_latency_ms": self._distribution(single_latencies * 1000)
+        }
+
+    def _model_report(self, model: tf.keras.Model, load_time_s: float) -> dict:
+        """
+        Footprint of the saved model: head, parameters, size on disk and load
+        time, None when a live model was scored and the artifact not loaded.
+        """
+        if self.writer is not None:
+            self.writer.wait([self.config.path_of_model])
+        # read from the model itself, it may predate the current params.yaml
+        head_layers = [layer for layer in model.layers if layer.name.startswith("head_")]
+        return {
+            "head_layers": [layer.name for layer in head_layers],
+            "parameters": int(model.count_params()),
+            "head_parameters": int(sum(layer.count_params() for layer in head_layers)),
+            "size_bytes": os.path.getsize(self.config.path_of_model),
+            "size": get_size(Path(self.config.path_of_model)),
+            "load_time_s": load_time_s
+        }
+
+
+    def _time_load(self):
+        if self.writer is not None:
+            self.writer.wait([self.config.path_of_model])
+        start = time.perf_counter()
+        model = self.load_model(self.config.path_of_model)
+        return model, time.perf_counter() - start
+
+    def evaluation(self, model: tf.keras.Model = None, measure_load: bool = False, valid_generator=None):
+        """
+        Args:
+            model: a live model from the training stage, scored as is.
+                Otherwise the saved artifact is loaded (and timed) the way
+                serving loads it.
+            valid_generator: the validation split the training stage built,
+                used instead of decoding it again when its images match.
+            measure_load: also time a load of the saved artifact when a live
+                model is given, e.g. to compare heads in a sweep. Off in the
+                pipeline, where it would deserialize the model only to time it.
+        """
+        load_time_s = None
+        if model is None:
+            model, load_time_s = self._time_load()
+        elif measure_load:
+            _, load_time_s = self._time_load()
+        self.model = apply_precision(model, self.config.params_precision)
+        self._validation_set(valid_generator)
+
+        probs, latencies, single_latencies = self._predict(self.model)
+        self.scores = self._metrics(probs)
+        self.scores["performance"] = self._performance(latencies, single_latencies)
+        self.scores["model"] = self._model_report(model, load_time_s)
+        logger.info(
+            f"accuracy: {self.scores['accuracy']:.4f}, loss: {self.scores['loss']:.4f}, "
+            f"{self.scores['performance']['images_per_sec']:.1f} images/sec, "
+            f"{self.scores['model']['size']}"
+            + (f", loaded in {load_time_s:.2f}s" if load_time_s is not None else "")
+        )
+
+        # the same weights computed in float32, to judge what bf16 costs
+        if self.config.params_precision != "float32":
+            float32_probs, _, _ = self._predict(apply_precision(model, "float32"))
+            float32_accuracy = float(np.mean(np.argmax(float32_probs, axis=1) == self.labels))
+            self.scores.update(
+                precision=self.config.params_precision,
+                float32_accuracy=float32_accuracy,
+                accuracy_delta=self.scores["accuracy"] - float32_accuracy
+            )
+
 
-    
-    def save_score(self):
-        scores = {"loss": self.score[0], "accuracy": self.score[1]}
-        save_json(path_to_json=Path("scores.json"), data=scores)
\ No newline at end of file
+    def save_score(self, path: Path = Path("scores.json")):
+        save_json(path_to_json=path, data=self.scores)
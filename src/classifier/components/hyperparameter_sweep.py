@@ -0,0 +1,238 @@
+import os
+import time
+import math
+import random
+import itertools
+import resource
+import multiprocessing
+import yaml
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from classifier import logger
+from classifier.entity.config_entity import SweepConfig
+from classifier.utils.common import read_yaml, save_json
+
+# params that change the prepared base model, a trial overriding one prepares its own
+BASE_MODEL_PARAMS = (
+    "IMAGE_SIZE", "INCLUDE_TOP", "CLASSES", "BACKBONE", "WEIGHTS",
+    "PRECISION", "HEAD_TYPE", "HEAD_UNITS", "HEAD_DROPOUT"
+)
+
+
+def _limit_threads(threads: int):
+    """Process pool initializer: caps the TensorFlow threads of one trial process."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def run_trial(trial_dir: str, config_filepath: str, params_filepath: str, keep_model: bool,
+              prepare_base_model: bool = False) -> dict:
+    """
+    Trains and evaluates one trial from its own config.yaml / params.yaml.
+
+    The prepared base model is read from its shared artifact path unless
+    `prepare_base_model` is set, and the trained model is evaluated in
+    memory, without a reload.
+
+    Returns:
+        dict: the trial's scores, its training + evaluation time and the
+            peak memory of the trial process.
+    """
+    from classifier.config.configuration import ConfigurationManager
+    from classifier.components.prepare_base_model import PrepareBaseModel
+    from classifier.components.prepare_callbacks import PrepareCallbacks
+    from classifier.components.training import Training
+    from classifier.components.evaluation import Evaluation
+
+    start = time.perf_counter()
+    config = ConfigurationManager(Path(config_filepath), Path(params_filepath))
+    if prepare_base_model:
+        base_model = PrepareBaseModel(config=config.get_prepare_base_model_config())
+        base_model.get_base_model()
+        base_model.update_base_model()
+
+    prepare_callbacks_config = config.get_prepare_callbacks_config()
+    callback_list = PrepareCallbacks(config=prepare_callbacks_config).get_callbacks()
+
+    training_config = config.get_training_config()
+    training = Training(config=training_config)
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train(callback_list=callback_list)
+
+    evaluation = Evaluation(config=config.get_evaluation_config())
+    # the load time is one of the numbers trials are compared on
+    evaluation.evaluation(model=training.model, measure_load=True)
+    evaluation.save_score(path=Path(trial_dir) / "scores.json")
+
+    if not keep_model:
+        paths = [training_config.trained_model_path, prepare_callbacks_config.checkpoint_model_filepath]
+        if prepare_base_model:
+            paths += [base_model.config.base_model_path, base_model.config.updated_base_model_path]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    performance, model = evaluation.scores["performance"], evaluation.scores["model"]
+    return {
+        "scores": {
+            "loss": evaluation.scores["loss"],
+            "accuracy": evaluation.scores["accuracy"],
+            "images_per_sec": performance["images_per_sec"],
+            "single_image_p50_ms": performance["single_image_latency_ms"]["p50"],
+            "parameters": model["parameters"],
+            "size": model["size"],
+            "load_time_s": model["load_time_s"]
+        },
+        "duration_s": time.perf_counter() - start,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+class HyperparameterSweep:
+    """
+    Grid or random search over params.yaml values.
+
+    Every trial gets a directory with its own params.yaml (the base params
+    plus the fixed and sampled overrides) and a config.yaml that points its
+    trained model, callbacks and feature cache into that directory, while
+    the prepared base model and the dataset stay shared. Trials that change
+    a BASE_MODEL_PARAMS value prepare their own base model in their
+    directory. Trials run in a pool of spawned processes, each capped at
+    `threads_per_trial` threads.
+    """
+
+    def __init__(self, config: SweepConfig):
+        self.config = config
+
+    def trials(self) -> list:
+        """The parameter overrides of each trial, in run order."""
+        space = self.config.search_space
+        if self.config.method == "grid":
+            names = list(space)
+            return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+        if self.config.method == "random":
+            rng = random.Random(self.config.seed)
+            return [
+                {name: self._sample(rng, values) for name, values in space.items()}
+                for _ in range(self.config.num_trials)
+            ]
+
+        raise ValueError(f"Unknown sweep method '{self.config.method}', expected grid or random")
+
+    @staticmethod
+    def _sample(rng: random.Random, values):
+        if isinstance(values, list):
+            return rng.choice(values)
+        # {low, high, log}: a continuous range, sampled log-uniformly if log is set
+        if values.get("log"):
+            return math.exp(rng.uniform(math.log(values["low"]), math.log(values["high"])))
+        value = rng.uniform(values["low"], values["high"])
+        return round(value) if isinstance(values["low"], int) and isinstance(values["high"], int) else value
+
+    @property
+    def workers(self) -> int:
+        if self.config.workers:
+            return self.config.workers
+        return max(1, (os.cpu_count() or 1) // self.config.threads_per_trial)
+
+    def _write_trial_files(self, trial_dir: Path, overrides: dict):
+        """
+        Returns:
+            tuple: (config.yaml path, params.yaml path, whether the trial
+                prepares its own base model).
+        """
+        base_config = read_yaml(self.config.config_filepath).to_dict()
+        base_params = read_yaml(self.config.params_filepath).to_dict()
+        trial_params = {**base_params, **self.config.fixed_params, **overrides}
+        prepare_base_model = any(
+            trial_params.get(name) != base_params.get(name) for name in BASE_MODEL_PARAMS
+        )
+        if prepare_base_model:
+            base_config["prepare_base_model"].update(
+                root_dir=str(trial_dir),
+                base_model_path=str(trial_dir / "base_model.h5"),
+                updated_base_model_path=str(trial_dir / "updated_base_model.h5")
+            )
+
+        base_config["prepare_callbacks"].update(
+            root_dir=str(trial_dir),
+            tensorboard_root_log_dir=str(trial_dir / "tensorboard_log_dir"),
+            checkpoint_model_filepath=str(trial_dir / "checkpoint_dir" / "model.h5")
+        )
+        base_config["training"].update(
+            root_dir=str(trial_dir),
+            trained_model_path=str(trial_dir / "trained_model.h5"),
+            feature_cache_dir=str(trial_dir / "features")
+        )
+
+        trial_dir.mkdir(parents=True, exist_ok=True)
+        config_filepath, params_filepath = trial_dir / "config.yaml", trial_dir / "params.yaml"
+        with open(config_filepath, "w") as f:
+            yaml.safe_dump(base_config, f, sort_keys=False)
+        with open(params_filepath, "w") as f:
+            yaml.safe_dump(trial_params, f, sort_keys=False)
+        return config_filepath, params_filepath, prepare_base_model
+
+    def run(self) -> list:
+        trials = self.trials()
+        logger.info(
+            f"Sweeping {len(trials)} trials ({self.config.method}) "
+            f"on {self.workers} workers x {self.config.threads_per_trial} threads"
+        )
+
+        results, futures = [], {}
+        # spawned, not forked: TensorFlow's runtime does not survive a fork
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_limit_threads,
+            initargs=(self.config.threads_per_trial,),
+            max_tasks_per_child=1
+        ) as executor:
+            for number, overrides in enumerate(trials):
+                trial_dir = Path(self.config.root_dir) / f"trial_{number:03d}"
+                config_filepath, params_filepath, prepare_base_model = self._write_trial_files(
+                    trial_dir, overrides
+                )
+                future = executor.submit(
+                    run_trial, str(trial_dir), str(config_filepath), str(params_filepath),
+                    self.config.keep_models, prepare_base_model
+                )
+                futures[future] = {"trial": trial_dir.name, "params": overrides}
+
+            for future in as_completed(futures):
+                result = futures[future]
+                try:
+                    result.update(status="succeeded", **future.result())
+                except Exception as e:
+                    logger.exception(e)
+                    result.update(status="failed", error=repr(e), scores={})
+                logger.info(f"Trial {result['trial']} {result['status']}: {result['scores']}")
+                results.append(result)
+
+        self.results = results
+        return results
+
+    def summarize(self) -> list:
+        """Ranks the trials by the configured metric (best first) and saves the summary."""
+        metric = self.config.metric
+        # loss is the one metric where lower is better; failed trials rank last
+        sign = -1 if metric == "loss" else 1
+        ranked = sorted(
+            self.results,
+            key=lambda result: sign * result["scores"].get(metric, sign * float("-inf")),
+            reverse=True
+        )
+        for rank, result in enumerate(ranked, start=1):
+            result["rank"] = rank
+            logger.info(f"#{rank} {result['trial']} {metric}={result['scores'].get(metric)} {result['params']}")
+
+        save_json(
+            path_to_json=Path(self.config.summary_path),
+            data={"method": self.config.method, "metric": metric, "trials": ranked}
+        )
+        return ranked
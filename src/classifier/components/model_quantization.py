@@ -0,0 +1,179 @@
+import os
+import random
+import threading
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from classifier import logger
+from classifier.utils.common import save_json, get_size
+from classifier.entity.config_entity import ModelQuantizationConfig
+from classifier.components.data_loader import PackedDataLoader, iterate_batches, VALIDATION_SPLIT
+from classifier.utils.precision import apply_precision
+from classifier.utils.backbones import get_preprocessing, load_metadata, save_metadata
+
+
+class TFLiteModel:
+    """
+    Thin callable around a TFLite interpreter so it can stand in for a Keras model.
+
+    The interpreter is not thread safe, so calls are serialized, and the input
+    tensor is only resized when the batch size changes.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.interpreter = tf.lite.Interpreter(
+            model_path=str(model_path),
+            num_threads=num_threads
+        )
+        self._input_index = self.interpreter.get_input_details()[0]["index"]
+        self._output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        batch = np.asarray(batch, dtype="float32")
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self._input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output_index).copy()
+
+
+class ModelQuantization:
+    def __init__(self, config: ModelQuantizationConfig, writer=None):
+        self.config = config
+        # an ArtifactWriter may still be saving the trained model during in-process runs
+        self.writer = writer
+        self.preprocess = get_preprocessing(self.config.trained_model_path)
+
+    def load_model(self, model: tf.keras.Model = None):
+        model = model if model is not None else tf.keras.models.load_model(self.config.trained_model_path)
+        # the converters start from the float32 graph, bf16 casts do not quantize
+        self.model = apply_precision(model, "float32")
+
+    def _packed_loader(self):
+        # extract_mode: stream leaves no unzipped images, only the packed shards
+        if os.path.isdir(self.config.training_data):
+            return None
+        return PackedDataLoader(
+            packed_dir=self.config.packed_data,
+            batch_size=self.config.params_batch_size,
+            validation_split=VALIDATION_SPLIT
+        )
+
+    def _representative_dataset(self):
+        # int8 calibration on a random sample of the training images
+        loader = self._packed_loader()
+        if loader is not None:
+            indices = np.random.default_rng(42).permutation(len(loader.labels))
+            for index in indices[: self.config.params_calibration_samples]:
+                img = self.preprocess(loader.gather(np.array([index])).astype("float32"))
+                yield [np.asarray(img, dtype="float32")]
+            return
+
+        image_paths = [
+            os.path.join(root, name)
+            for root, _, files in os.walk(self.config.training_data)
+            for name in files
+            if name.lower().endswith((".jpg", ".jpeg", ".png"))
+        ]
+        random.Random(42).shuffle(image_paths)
+
+        for path in image_paths[: self.config.params_calibration_samples]:
+            img = tf.keras.preprocessing.image.load_img(
+                path, target_size=self.config.params_image_size[:-1]
+            )
+            img = self.preprocess(tf.keras.preprocessing.image.img_to_array(img))
+            yield [np.expand_dims(img, axis=0).astype("float32")]
+
+    def _convert(self, path: Path, int8: bool):
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if int8:
+            # input and output stay float32 so serving preprocessing is unchanged
+            converter.representative_dataset = self._representative_dataset
+        else:
+            converter.target_spec.supported_types = [tf.float16]
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(converter.convert())
+        save_metadata(path, load_metadata(self.config.trained_model_path))
+        logger.info(f"TFLite model saved at: {path} ({get_size(path)})")
+
+    def convert(self):
+        self._convert(self.config.fp16_model_path, int8=False)
+        self._convert(self.config.int8_model_path, int8=True)
+
+    def _validation_batches(self):
+        # same validation split the evaluation stage scores against
+        loader = self._packed_loader()
+        if loader is not None:
+            indices = loader.list_subset("validation")
+            one_hot = np.eye(len(loader.class_indices), dtype="float32")
+            for start in range(0, len(indices), self.config.params_batch_size):
+                batch = indices[start:start + self.config.params_batch_size]
+                images = self.preprocess(loader.gather(batch).astype("float32"))
+                yield np.asarray(images, dtype="float32"), one_hot[loader.labels[batch]]
+            return
+
+        valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
+            preprocessing_function=self.preprocess,
+            validation_split=VALIDATION_SPLIT
+        )
+        generator = valid_datagenerator.flow_from_directory(
+            directory=self.config.training_data,
+            subset="validation",
+            shuffle=False,
+            target_size=self.config.params_image_size[:-1],
+            batch_size=self.config.params_batch_size,
+            interpolation="bilinear"
+        )
+        for step in range(len(generator)):
+            yield generator[step]
+
+    @staticmethod
+    def _accuracy(predict_fn, batches) -> float:
+        correct = samples = 0
+        for images, labels in batches:
+            probs = np.asarray(predict_fn(images))
+            correct += int(np.sum(np.argmax(probs, axis=1) == np.argmax(labels, axis=1)))
+            samples += len(labels)
+        return correct / samples
+
+    def evaluate(self, valid_generator=None):
+        # the training stage's preprocessed validation split, read once for all three models
+        batches = list(iterate_batches(valid_generator)) if valid_generator is not None else []
+        if any(images.shape[1:] != tuple(self.config.params_image_size) for images, _ in batches):
+            batches = []
+        validation = lambda: batches or self._validation_batches()
+
+        keras_accuracy = self._accuracy(
+            lambda batch: self.model(batch, training=False), validation()
+        )
+
+        if self.writer is not None:
+            self.writer.wait([self.config.trained_model_path])
+        self.scores = {
+            "keras": {
+                "accuracy": keras_accuracy,
+                "size": get_size(Path(self.config.trained_model_path))
+            }
+        }
+        for name, path in (
+            ("tflite-fp16", self.config.fp16_model_path),
+            ("tflite-int8", self.config.int8_model_path)
+        ):
+            accuracy = self._accuracy(TFLiteModel(path), validation())
+            self.scores[name] = {
+                "accuracy": accuracy,
+                "accuracy_delta": accuracy - keras_accuracy,
+                "size": get_size(Path(path))
+            }
+            logger.info(f"{name} accuracy: {accuracy:.4f} (keras: {keras_accuracy:.4f})")
+
+    def save_score(self):
+        save_json(path_to_json=Path(self.config.scores_path), data=self.scores)
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+from pathlib import Path
+from classifier import logger
+from classifier.entity.config_entity import ModelRegistryConfig
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts in a local directory:
+
+        <root_dir>/versions/v0001/   trained_model.h5, its sidecar .json, scores, manifest.json
+        <root_dir>/versions/v0002/
+        <root_dir>/current           {"version": "v0002", "previous": ["v0001"]}
+
+    Version directories are assembled under a temporary name and renamed into
+    place, and `current` is replaced in one os.replace, so a reader sees either
+    the old version or the new one, never a partial one.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir)
+        self.versions_dir = self.root_dir / "versions"
+        self.pointer_path = self.root_dir / "current"
+
+    def versions(self) -> list:
+        if not self.versions_dir.exists():
+            return []
+        return sorted(
+            path.name for path in self.versions_dir.iterdir()
+            if path.is_dir() and path.name.startswith("v")
+        )
+
+    def _read_pointer(self) -> dict:
+        if not self.pointer_path.exists():
+            return {"version": None, "previous": []}
+        with open(self.pointer_path) as f:
+            return json.load(f)
+
+    def _write_pointer(self, pointer: dict):
+        tmp_path = self.pointer_path.with_name(f"current.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(pointer, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+
+    def current(self):
+        """The version `current` points at, None for an empty registry."""
+        return self._read_pointer()["version"]
+
+    def path(self, version: str, name: str) -> Path:
+        return self.versions_dir / version / name
+
+    def manifest(self, version: str) -> dict:
+        with open(self.path(version, "manifest.json")) as f:
+            return json.load(f)
+
+    def _next_version(self) -> str:
+        versions = self.versions()
+        number = int(versions[-1][1:]) + 1 if versions else 1
+        return f"v{number:04d}"
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def publish(self, artifacts: dict, metadata: dict = None, promote: bool = True) -> str:
+        """
+        Copies a set of artifacts into a new version.
+
+        Args:
+            artifacts (dict): file name in the version -> source path. Missing
+                sources are skipped; a model's sidecar .json is copied with it.
+            metadata (dict): extra fields for the version's manifest.json.
+            promote (bool): point `current` at the new version.
+
+        Returns:
+            str: the new version, e.g. "v0003".
+        """
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.versions_dir / f".tmp-{uuid.uuid4().hex}"
+        tmp_dir.mkdir()
+        files = {}
+        try:
+            for name, source in artifacts.items():
+                source = Path(source)
+                if not source.exists():
+                    continue
+                # the sidecar .json next to a model (utils/backbones.py), not
+                # imported from there to keep TensorFlow out of the server's startup
+                sidecar = (source.with_suffix(".json"), Path(name).with_suffix(".json").name)
+                for src, dst in ((source, name), sidecar):
+                    if src.exists() and dst not in files:
+                        shutil.copy2(src, tmp_dir / dst)
+                        files[dst] = self._sha256(tmp_dir / dst)
+
+            version = self._next_version()
+            with open(tmp_dir / "manifest.json", "w") as f:
+                json.dump({
+                    "version": version,
+                    "created_at": time.time(),
+                    "files": files,
+                    **(metadata or {})
+                }, f, indent=4)
+            os.rename(tmp_dir, self.versions_dir / version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Published model version {version}: {sorted(files)}")
+        if promote:
+            self.promote(version)
+        return version
+
+    def promote(self, version: str):
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version '{version}', expected one of {self.versions()}")
+        pointer = self._read_pointer()
+        if pointer["version"] == version:
+            return
+        previous = pointer["previous"] + ([pointer["version"]] if pointer["version"] else [])
+        self._write_pointer({"version": version, "previous": previous})
+        logger.info(f"Current model version is now {version}")
+
+    def rollback(self, version: str = None) -> str:
+        """
+        Points `current` back at `version`, or at the version it replaced.
+
+        Returns:
+            str: the version now current.
+        """
+        pointer = self._read_pointer()
+        if version is not None:
+            self.promote(version)
+            return version
+
+        previous = [v for v in pointer["previous"] if v in self.versions()]
+        if not previous:
+            raise ValueError("No earlier model version to roll back to")
+        version = previous.pop()
+        # the rolled back version is not kept as a rollback target
+        self._write_pointer({"version": version, "previous": previous})
+        logger.info(f"Rolled back from {pointer['version']} to {version}")
+        return version
+
+    def prune(self, keep: int):
+        """Deletes the oldest versions beyond the newest `keep`, never the current one."""
+        if keep <= 0:
+            return
+        current = self.current()
+        for version in self.versions()[:-keep]:
+            if version != current:
+                shutil.rmtree(self.versions_dir / version)
+                logger.info(f"Pruned model version {version}")
+
+
+class ModelRegistration:
+    """Publishes the pipeline's serving artifacts as a new registry version."""
+
+    def __init__(self, config: ModelRegistryConfig):
+        self.config = config
+        self.registry = ModelRegistry(self.config.root_dir)
+
+    def register(self) -> str:
+        metadata = {}
+        if os.path.exists(self.config.scores_path):
+            with open(self.config.scores_path) as f:
+                scores = json.load(f)
+            metadata = {"accuracy": scores.get("accuracy"), "loss": scores.get("loss")}
+
+        self.version = self.registry.publish(self.config.artifacts, metadata=metadata)
+        self.registry.prune(self.config.keep_versions)
+        return self.version
@@ -3,27 +3,41 @@ import urllib.request as request
 from zipfile import ZipFile
 import tensorflow as tf
 from classifier.entity.config_entity import PrepareBaseModelConfig
+from classifier.utils.precision import apply_precision
+from classifier.utils.backbones import build_backbone, backbone_metadata, persist_model
 from pathlib import Path
 from classifier.config.configuration import ConfigurationManager
 
+# feature map reductions a head can start with
+HEAD_TYPES = {
+    "flatten": tf.keras.layers.Flatten,
+    "gap": tf.keras.layers.GlobalAveragePooling2D,
+    "gmp": tf.keras.layers.GlobalMaxPooling2D,
+}
+
 class PrepareBaseModel:
-    def __init__(self, config: PrepareBaseModelConfig):
+    def __init__(self, config: PrepareBaseModelConfig, writer=None):
         self.config = config
+        self.writer = writer
     
-    # Created by: Visual Geometry Group (Oxford)
-    # “19” = 19 layers with weights (mostly Conv + Dense)
+    # BACKBONE picks the architecture (VGG19 by default), see utils/backbones.py
     
     def get_base_model(self):
-        self.model = tf.keras.applications.vgg19.VGG19(
+        self.model = build_backbone(
+            name = self.config.params_backbone,
             input_shape = self.config.params_image_size,
             weights = self.config.params_weights,
             include_top = self.config.params_include_top
         )
 
-        self.save_model(path = self.config.base_model_path, model = self.model)
+        self._persist(path = self.config.base_model_path, model = self.model)
 
     @staticmethod
-    def _prepare_base_model(model, classes, freeze_all, freeze_till, learning_rate):
+    def _prepare_base_model(model, classes, freeze_all, freeze_till, learning_rate, precision="float32",
+                            head_type="flatten", head_units=0, head_dropout=0.0):
+        # mixed_bfloat16 runs the backbone in bf16, the weights stay float32
+        model = apply_precision(model, precision)
+
         if freeze_all:
             for layer in model.layers:
                 layer.trainable = False
@@ -31,11 +45,29 @@ class PrepareBaseModel:
             for layer in model.layers[: -freeze_till]:
                 layer.trainable = False
         
-        flatten_in = tf.keras.layers.Flatten()(model.output)
+        if head_type not in HEAD_TYPES:
+            raise ValueError(f"Unknown head type '{head_type}', expected one of {list(HEAD_TYPES)}")
+
+        # "head_" layers are what split_backbone_head treats as the trainable head
+        # pooling heads reduce the feature map (7x7x512 for VGG19) to one value per channel
+        x = HEAD_TYPES[head_type](name=f"head_{head_type}", dtype=precision)(model.output)
+        if head_units:
+            x = tf.keras.layers.Dense(
+                units=head_units,
+                activation="relu",
+                name="head_bottleneck",
+                dtype=precision
+            )(x)
+        if head_dropout:
+            x = tf.keras.layers.Dropout(head_dropout, name="head_dropout", dtype=precision)(x)
+
+        # the softmax is computed in float32 whatever the policy
         prediction = tf.keras.layers.Dense(
             units=classes,
-            activation="softmax"
-        )(flatten_in)
+            activation="softmax",
+            name="head_dense",
+            dtype="float32"
+        )(x)
 
         full_model = tf.keras.models.Model(
             inputs = model.input,
@@ -60,11 +92,57 @@ class PrepareBaseModel:
             classes = self.config.params_classes, 
             freeze_all=True,
             freeze_till=None,
-            learning_rate=self.config.params_learning_rate
+            learning_rate=self.config.params_learning_rate,
+            precision=self.config.params_precision,
+            head_type=self.config.params_head_type,
+            head_units=self.config.params_head_units,
+            head_dropout=self.config.params_head_dropout
         )
 
-        self.save_model(path=self.config.updated_base_model_path, model = self.full_model)
+        self._persist(path=self.config.updated_base_model_path, model = self.full_model)
     
+    @staticmethod
+    def split_backbone_head(model: tf.keras.Model):
+        """
+        Splits a prepared model into its convolutional backbone and head layers.
+
+        Args:
+            model (tf.keras.Model): a model built by `_prepare_base_model`.
+
+        Returns:
+            tuple: (backbone model mapping images to the feature map,
+                list of head layers to apply on top of it, in order).
+        """
+        head_start = next(
+            (i for i, layer in enumerate(model.layers) if layer.name.startswith("head_")),
+            None
+        )
+        if head_start is None:
+            # models prepared before the head layers were named
+            head_start = next(
+                i for i, layer in enumerate(model.layers)
+                if isinstance(layer, tf.keras.layers.Flatten)
+            )
+
+        backbone = tf.keras.models.Model(
+            inputs=model.input,
+            outputs=model.layers[head_start - 1].output
+        )
+        return backbone, model.layers[head_start:]
+
+    @staticmethod
+    def build_head(feature_shape, head_layers) -> tf.keras.Model:
+        """Wraps head layers (sharing their weights) into a model over backbone features."""
+        features = tf.keras.Input(shape=feature_shape)
+        x = features
+        for layer in head_layers:
+            x = layer(x)
+        return tf.keras.models.Model(inputs=features, outputs=x)
+
+    def _persist(self, path: Path, model: tf.keras.Model):
+        # the sidecar tells later stages and serving how to preprocess inputs
+        persist_model(path, model, backbone_metadata(self.config.params_backbone), writer=self.writer)
+
     @staticmethod
     def save_model(path: Path, model: tf.keras.Model):
         model.save(path)
\ No newline at end of file
@@ -5,34 +5,139 @@ import tensorflow as tf
 import time
 from tensorflow import keras
 import math
+import numpy as np
 from pathlib import Path
+from classifier import logger
 from classifier.entity.config_entity import TrainingConfig
+from classifier.components.prepare_base_model import PrepareBaseModel
+from classifier.components.data_loader import DataLoader, PackedDataLoader, VALIDATION_SPLIT, iterate_batches
+from classifier.utils.precision import apply_precision
+from classifier.utils.backbones import get_preprocessing, load_metadata, persist_model
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """
+    Logs training steps/sec and images/sec for each epoch, tagged with the execution mode.
+
+    Only the training steps are timed: validation runs outside the batch
+    callbacks, and the first execution, which traces and compiles the train
+    function, is left out of epoch 1.
+    """
+
+    def __init__(self, mode: str, batch_size: int):
+        super().__init__()
+        self.mode = mode
+        self.batch_size = batch_size
+
+    def on_train_begin(self, logs=None):
+        self._traced = False
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._steps = 0
+        self._elapsed = 0.0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._first_step = batch
+        self._start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        if self._traced:
+            # with steps_per_execution > 1, one callback covers several steps
+            self._steps += batch - self._first_step + 1
+            self._elapsed += elapsed
+        self._traced = True
+
+    def on_epoch_end(self, epoch, logs=None):
+        if not self._steps:
+            return
+        logger.info(
+            f"Epoch {epoch + 1} [{self.mode}]: {self._steps / self._elapsed:.2f} steps/sec, "
+            f"{self._steps * self.batch_size / self._elapsed:.1f} images/sec"
+        )
+
+
+class FeatureSequence(tf.keras.utils.Sequence):
+    """Batches cached backbone features straight out of their memory-mapped file."""
+
+    def __init__(self, features, labels, batch_size, shuffle):
+        super().__init__()
+        self.features = features
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.indices = np.arange(len(labels))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return math.ceil(len(self.labels) / self.batch_size)
+
+    def __getitem__(self, idx):
+        # sorted indices keep reads from the memmap mostly sequential
+        batch = np.sort(self.indices[idx * self.batch_size:(idx + 1) * self.batch_size])
+        return np.asarray(self.features[batch]), self.labels[batch]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
 
-tf.config.run_functions_eagerly(True)
 
 class Training:
-    def __init__(self, config: TrainingConfig):
+    def __init__(self, config: TrainingConfig, writer=None):
         self.config = config
+        self.writer = writer
+        # inputs are preprocessed the way the base model's backbone expects
+        self.preprocess = get_preprocessing(self.config.updated_base_model_path)
     
-    def get_base_model(self):
-        #  load without optimizer state
-        self.model = tf.keras.models.load_model(
-            self.config.updated_base_model_path,
-            compile=False
-        )
+    def get_base_model(self, model: tf.keras.Model = None):
+        if model is not None:
+            # the live model handed over by PrepareBaseModel, no reload
+            self.model = model
+        else:
+            #  load without optimizer state
+            self.model = tf.keras.models.load_model(
+                self.config.updated_base_model_path,
+                compile=False
+            )
+
+        # a base model prepared under another policy is rebuilt with its weights
+        self.model = apply_precision(self.model, self.config.params_precision)
 
         # compile fresh optimizer
-        self.model.compile(
-            optimizer=tf.keras.optimizers.SGD(),
+        self._compile(self.model)
+
+    @property
+    def execution_mode(self) -> str:
+        if self.config.params_run_eagerly:
+            return "eager"
+        return "graph+xla" if self.config.params_jit_compile else "graph"
+
+    def _compile(self, model: tf.keras.Model):
+        # compiled graph steps by default, eager only as an explicit debug switch
+        model.compile(
+            optimizer=tf.keras.optimizers.SGD(learning_rate=self.config.params_learning_rate),
             loss=tf.keras.losses.CategoricalCrossentropy(),
-            metrics=["accuracy"]
+            metrics=["accuracy"],
+            run_eagerly=self.config.params_run_eagerly,
+            jit_compile=self.config.params_jit_compile and not self.config.params_run_eagerly,
+            steps_per_execution=self.config.params_steps_per_execution
+        )
+        logger.info(
+            f"Training in {self.execution_mode} mode, {self.config.params_precision} "
+            f"(steps_per_execution={self.config.params_steps_per_execution})"
         )
+
+    def _callbacks(self, callback_list: list) -> list:
+        return callback_list + [
+            ThroughputLogger(self.execution_mode, self.config.params_batch_size)
+        ]
     
     def train_valid_generator(self):
+        if self.config.params_data_pipeline in ("tf_data", "packed"):
+            return self.train_valid_dataset()
 
         datagenerator_kwargs = dict(
-            rescale=1./255,
-            validation_split=0.20
+            preprocessing_function=self.preprocess,
+            validation_split=VALIDATION_SPLIT
         )
 
         dataflow_kwargs = dict(
@@ -77,6 +182,35 @@ class Training:
         print("Valid samples:", self.valid_generator.samples)
         print("Classes:", self.train_generator.class_indices)
 
+    def train_valid_dataset(self):
+        if self.config.params_data_pipeline == "packed":
+            loader = PackedDataLoader(
+                packed_dir=self.config.packed_data,
+                batch_size=self.config.params_batch_size,
+                validation_split=VALIDATION_SPLIT
+            )
+        else:
+            loader = DataLoader(
+                directory=self.config.training_data,
+                image_size=self.config.params_image_size,
+                batch_size=self.config.params_batch_size,
+                validation_split=VALIDATION_SPLIT
+            )
+        self.valid_generator = loader.load(
+            "validation", cache=self.config.params_cache_validation, preprocess=self.preprocess
+        )
+        self.train_generator = loader.load(
+            "training", shuffle=True, augment=self.config.params_is_augmentation,
+            preprocess=self.preprocess
+        )
+
+        print("Train samples:", self.train_generator.samples)
+        print("Valid samples:", self.valid_generator.samples)
+        print("Classes:", self.train_generator.class_indices)
+
+    def _persist(self, path: Path, model: tf.keras.Model):
+        persist_model(path, model, load_metadata(self.config.updated_base_model_path), writer=self.writer)
+
     @staticmethod
     def save_model(path: Path, model: tf.keras.Model):
         path = Path(path)
@@ -84,21 +218,94 @@ class Training:
         model.save(path)
 
 
-    def train(self, callback_list: list):
+    def train(self, callback_list: list, use_feature_cache=None):
+        if use_feature_cache is None:
+            use_feature_cache = self.config.params_feature_cache
+        if use_feature_cache:
+            return self.train_on_features(callback_list)
 
         self.steps_per_epoch = math.ceil(self.train_generator.samples / self.train_generator.batch_size)
         self.validation_steps = math.ceil(self.valid_generator.samples / self.valid_generator.batch_size)
 
         self.model.fit(
-            self.train_generator,
+            getattr(self.train_generator, "dataset", self.train_generator),
             epochs=self.config.params_epochs,
             steps_per_epoch=self.steps_per_epoch,
-            validation_data=self.valid_generator,
+            validation_data=getattr(self.valid_generator, "dataset", self.valid_generator),
             validation_steps=self.validation_steps,
-            callbacks=callback_list
+            callbacks=self._callbacks(callback_list)
+        )
+
+        self._persist(
+            path=self.config.trained_model_path,
+            model=self.model
+        )
+
+    def _extract_features(self, backbone, generator, name, copies=1):
+        """
+        Runs the frozen backbone once per image (per augmented copy) and stores
+        the feature maps in a memory-mapped .npy file under artifacts/.
+        """
+        total = generator.samples * copies
+        feature_path = Path(self.config.feature_cache_dir) / f"{name}_features.npy"
+        feature_path.parent.mkdir(parents=True, exist_ok=True)
+
+        features = np.lib.format.open_memmap(
+            feature_path, mode="w+", dtype="float32",
+            shape=(total, *backbone.output_shape[1:])
+        )
+        labels = np.zeros((total, generator.num_classes), dtype="float32")
+
+        offset = 0
+        for _ in range(copies):
+            # every pass through an augmenting generator draws new transforms
+            for images, batch_labels in iterate_batches(generator):
+                batch_features = backbone.predict_on_batch(images)
+                features[offset:offset + len(images)] = batch_features
+                labels[offset:offset + len(images)] = batch_labels
+                offset += len(images)
+
+        features.flush()
+        del features
+        logger.info(f"Cached {total} {name} feature maps at: {feature_path}")
+        return np.load(feature_path, mmap_mode="r"), labels
+
+    def train_on_features(self, callback_list: list):
+        """
+        Head-only training for a frozen backbone: features are computed once and
+        the head trains on them, then the full end-to-end model is saved.
+        """
+        backbone, head_layers = PrepareBaseModel.split_backbone_head(self.model)
+        if any(layer.trainable and layer.weights for layer in backbone.layers):
+            logger.warning("Backbone is not frozen, falling back to end-to-end training")
+            return self.train(callback_list, use_feature_cache=False)
+
+        copies = self.config.params_feature_cache_copies if self.config.params_is_augmentation else 1
+        train_features, train_labels = self._extract_features(
+            backbone, self.train_generator, "train", copies=copies
+        )
+        valid_features, valid_labels = self._extract_features(
+            backbone, self.valid_generator, "valid"
+        )
+
+        # head layers are shared with self.model, so training them trains it
+        head = PrepareBaseModel.build_head(backbone.output_shape[1:], head_layers)
+        self._compile(head)
+
+        # a checkpoint of the head alone would not be a usable model
+        callbacks = [
+            callback for callback in callback_list
+            if not isinstance(callback, tf.keras.callbacks.ModelCheckpoint)
+        ]
+
+        head.fit(
+            FeatureSequence(train_features, train_labels, self.config.params_batch_size, shuffle=True),
+            epochs=self.config.params_epochs,
+            validation_data=FeatureSequence(valid_features, valid_labels, self.config.params_batch_size, shuffle=False),
+            callbacks=self._callbacks(callbacks)
         )
 
-        self.save_model(
+        self._persist(
             path=self.config.trained_model_path,
             model=self.model
         )
@@ -1,10 +1,16 @@
 from classifier.constants import *
 from classifier.utils.common import read_yaml, create_directories
 from classifier.entity.config_entity import DataIngestionConfig
+from classifier.entity.config_entity import DatasetPackingConfig
 from classifier.entity.config_entity import PrepareBaseModelConfig
 from classifier.entity.config_entity import PrepareCallbacksConfig
 from classifier.entity.config_entity import TrainingConfig
 from classifier.entity.config_entity import EvaluationConfig
+from classifier.entity.config_entity import ModelQuantizationConfig
+from classifier.entity.config_entity import DistillationConfig
+from classifier.entity.config_entity import ModelRegistryConfig
+from classifier.entity.config_entity import SweepConfig
+from classifier.entity.config_entity import ServingConfig
 from pathlib import Path
 import os
 
@@ -14,11 +20,24 @@ class ConfigurationManager:
         config_filepath=CONFIG_FILE_PATH,
         params_filepath=PARAMS_FILE_PATH,
     ):
+        self.config_filepath = Path(config_filepath)
+        self.params_filepath = Path(params_filepath)
         self.config = read_yaml(config_filepath)
         self.params = read_yaml(params_filepath)
 
         create_directories([self.config.artifacts_root])
 
+    def _data_pipeline(self) -> str:
+        """DATA_PIPELINE, checked against the extraction mode that feeds it."""
+        data_pipeline = self.params.DATA_PIPELINE
+        extract_mode = self.config.data_ingestion.extract_mode
+        if extract_mode == "stream" and data_pipeline != "packed":
+            raise ValueError(
+                f"DATA_PIPELINE '{data_pipeline}' reads the unzipped images, which extract_mode "
+                f"'stream' never writes; use DATA_PIPELINE 'packed' or another extract_mode"
+            )
+        return data_pipeline
+
     # defining the dataingestion config as the return type
     def get_data_ingestion_config(self) -> DataIngestionConfig:
         config = self.config.data_ingestion
@@ -30,9 +49,29 @@ class ConfigurationManager:
             source_URL=config.source_URL,
             local_data_file=Path(config.local_data_file),
             unzip_dir=Path(config.unzip_dir),
+            extract_mode=config.extract_mode,
+            sha256=config.sha256,
+            download_workers=config.download_workers,
+            download_chunk_mb=config.download_chunk_mb,
         )
 
         return data_ingestion_config
+
+    # packing the extracted images into pre-resized uint8 shards
+    def get_dataset_packing_config(self) -> DatasetPackingConfig:
+        config = self.config.data_ingestion
+
+        dataset_packing_config = DatasetPackingConfig(
+            source_dir=Path(os.path.join(config.unzip_dir, "brain_tumor_dataset")),
+            packed_dir=Path(config.packed_dir),
+            shard_size=config.shard_size,
+            local_data_file=Path(config.local_data_file),
+            extract_mode=config.extract_mode,
+            read_workers=config.read_workers,
+            params_image_size=self.params.IMAGE_SIZE
+        )
+
+        return dataset_packing_config
     
     # defining the dataingestion config as the return type
     def get_prepare_base_model_config(self) -> PrepareBaseModelConfig:
@@ -48,7 +87,12 @@ class ConfigurationManager:
             params_learning_rate = self.params.LEARNING_RATE,
             params_include_top = self.params.INCLUDE_TOP,
             params_weights = self.params.WEIGHTS,
-            params_classes = self.params.CLASSES
+            params_classes = self.params.CLASSES,
+            params_precision = self.params.PRECISION,
+            params_head_type = self.params.HEAD_TYPE,
+            params_head_units = self.params.HEAD_UNITS,
+            params_head_dropout = self.params.HEAD_DROPOUT,
+            params_backbone = self.params.BACKBONE
         )
 
         return prepare_base_model_config
@@ -86,19 +130,181 @@ class ConfigurationManager:
             trained_model_path=Path(training.trained_model_path),
             updated_base_model_path=Path(prepare_base_model.updated_base_model_path),
             training_data=Path(training_data),
+            packed_data=Path(self.config.data_ingestion.packed_dir),
             params_epochs=params.EPOCHS,
             params_batch_size=params.BATCH_SIZE,
             params_image_size=params.IMAGE_SIZE,
             params_is_augmentation=params.AUGMENTATION,
+            feature_cache_dir=Path(training.feature_cache_dir),
+            params_feature_cache=params.FEATURE_CACHE,
+            params_feature_cache_copies=params.FEATURE_CACHE_COPIES,
+            params_data_pipeline=self._data_pipeline(),
+            params_cache_validation=params.CACHE_VALIDATION,
+            params_learning_rate=params.LEARNING_RATE,
+            params_jit_compile=params.JIT_COMPILE,
+            params_steps_per_execution=params.STEPS_PER_EXECUTION,
+            params_run_eagerly=params.RUN_EAGERLY,
+            params_precision=params.PRECISION,
         )
         return training_config
 
-    def get_validation_config(self) -> EvaluationConfig:
+    def get_evaluation_config(self, path_of_model=None) -> EvaluationConfig:
         eval_config = EvaluationConfig(
-            path_of_model=Path("artifacts/training/trained_model.h5"),
-            training_data=Path("artifacts/data_ingestion/unzip/brain_tumor_dataset"),
+            path_of_model=Path(path_of_model or self.config.training.trained_model_path),
+            training_data=Path(os.path.join(self.config.data_ingestion.unzip_dir, "brain_tumor_dataset")),
+            packed_data=Path(self.config.data_ingestion.packed_dir),
             all_params=self.params,
             params_image_size=self.params.IMAGE_SIZE,
-            params_batch_size=self.params.BATCH_SIZE
+            params_eval_batch_size=self.params.EVAL_BATCH_SIZE,
+            params_data_pipeline=self._data_pipeline(),
+            params_precision=self.params.PRECISION
         )
         return eval_config
+
+    # converting the trained model into quantized TFLite variants
+    def get_model_quantization_config(self) -> ModelQuantizationConfig:
+        config = self.config.model_quantization
+
+        create_directories([config.root_dir])
+
+        model_quantization_config = ModelQuantizationConfig(
+            root_dir=Path(config.root_dir),
+            trained_model_path=Path(self.config.training.trained_model_path),
+            fp16_model_path=Path(config.fp16_model_path),
+            int8_model_path=Path(config.int8_model_path),
+            scores_path=Path(config.scores_path),
+            training_data=Path(os.path.join(self.config.data_ingestion.unzip_dir, "brain_tumor_dataset")),
+            packed_data=Path(self.config.data_ingestion.packed_dir),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_batch_size=self.params.BATCH_SIZE,
+            params_calibration_samples=self.params.CALIBRATION_SAMPLES
+        )
+        return model_quantization_config
+
+    # distilling the trained model into a small student CNN
+    def get_distillation_config(self) -> DistillationConfig:
+        config = self.config.distillation
+
+        create_directories([config.root_dir])
+
+        distillation_config = DistillationConfig(
+            root_dir=Path(config.root_dir),
+            teacher_model_path=Path(self.config.training.trained_model_path),
+            student_model_path=Path(config.student_model_path),
+            scores_path=Path(config.scores_path),
+            training_data=Path(os.path.join(self.config.data_ingestion.unzip_dir, "brain_tumor_dataset")),
+            packed_data=Path(self.config.data_ingestion.packed_dir),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_batch_size=self.params.BATCH_SIZE,
+            params_classes=self.params.CLASSES,
+            params_is_augmentation=self.params.AUGMENTATION,
+            params_data_pipeline=self._data_pipeline(),
+            params_epochs=self.params.DISTILL_EPOCHS,
+            params_learning_rate=self.params.DISTILL_LEARNING_RATE,
+            params_temperature=self.params.DISTILL_TEMPERATURE,
+            params_alpha=self.params.DISTILL_ALPHA,
+            params_student_filters=list(self.params.STUDENT_FILTERS)
+        )
+        return distillation_config
+
+    # versioned serving artifacts, published after every pipeline run
+    def get_model_registry_config(self) -> ModelRegistryConfig:
+        config = self.config.model_registry
+
+        create_directories([config.root_dir])
+
+        # file name inside a version -> artifact the pipeline wrote
+        serving_artifacts = [
+            self.config.training.trained_model_path,
+            self.config.distillation.student_model_path,
+            self.config.model_quantization.fp16_model_path,
+            self.config.model_quantization.int8_model_path,
+        ]
+        artifacts = {Path(path).name: Path(path) for path in serving_artifacts}
+        artifacts["scores.json"] = Path("scores.json")
+        artifacts["student_scores.json"] = Path(self.config.distillation.scores_path)
+        artifacts["quantization_scores.json"] = Path(self.config.model_quantization.scores_path)
+
+        model_registry_config = ModelRegistryConfig(
+            root_dir=Path(config.root_dir),
+            keep_versions=config.keep_versions,
+            scores_path=Path("scores.json"),
+            artifacts=artifacts
+        )
+        return model_registry_config
+
+    # hyperparameter sweep over params.yaml, run by HyperparameterSweep
+    def get_sweep_config(self) -> SweepConfig:
+        config = self.config.sweep
+
+        create_directories([config.root_dir])
+
+        sweep_config = SweepConfig(
+            root_dir=Path(config.root_dir),
+            summary_path=Path(config.summary_path),
+            config_filepath=self.config_filepath,
+            params_filepath=self.params_filepath,
+            method=config.method,
+            num_trials=config.num_trials,
+            seed=config.seed,
+            workers=config.workers,
+            threads_per_trial=config.threads_per_trial,
+            metric=config.metric,
+            keep_models=config.keep_models,
+            fixed_params=config.fixed_params.to_dict() if config.fixed_params else {},
+            search_space=config.search_space.to_dict()
+        )
+        return sweep_config
+
+    # one sweep trial per backbone, see HyperparameterSweep
+    def get_backbone_comparison_config(self) -> SweepConfig:
+        config = self.config.backbone_comparison
+
+        create_directories([config.root_dir])
+
+        backbone_comparison_config = SweepConfig(
+            root_dir=Path(config.root_dir),
+            summary_path=Path(config.summary_path),
+            config_filepath=self.config_filepath,
+            params_filepath=self.params_filepath,
+            method="grid",
+            num_trials=len(config.backbones),
+            seed=0,
+            workers=config.workers,
+            threads_per_trial=config.threads_per_trial or os.cpu_count(),
+            metric=config.metric,
+            keep_models=config.keep_models,
+            fixed_params=config.fixed_params.to_dict() if config.fixed_params else {},
+            search_space={"BACKBONE": list(config.backbones)}
+        )
+        return backbone_comparison_config
+
+    # serving options for the flask app
+    def get_serving_config(self) -> ServingConfig:
+        config = self.config.serving
+
+        serving_config = ServingConfig(
+            backend=config.backend,
+            num_threads=config.num_threads,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms,
+            batch_chunk_size=config.batch_chunk_size,
+            ready_timeout_s=config.ready_timeout_s,
+            jit_compile=config.jit_compile,
+            warmup_runs=config.warmup_runs,
+            workers=config.workers,
+            worker_threads=config.worker_threads,
+            intra_op_threads=config.intra_op_threads,
+            inter_op_threads=config.inter_op_threads,
+            cache_size=config.cache_size,
+            cache_ttl_s=config.cache_ttl_s,
+            precision=self.params.PRECISION,
+            model=config.model,
+            registry_dir=Path(self.config.model_registry.root_dir),
+            registry_poll_s=config.registry_poll_s,
+            shadow_heads=list(config.shadow_heads or []),
+            ab_head=config.ab_head,
+            ab_fraction=config.ab_fraction,
+            training_jobs_dir=Path(config.training_jobs_dir)
+        )
+        return serving_config
@@ -7,6 +7,20 @@ class DataIngestionConfig:
     source_URL: str
     local_data_file: Path
     unzip_dir: Path
+    extract_mode: str
+    sha256: str
+    download_workers: int
+    download_chunk_mb: int
+
+@dataclass(frozen=True)
+class DatasetPackingConfig:
+    source_dir: Path
+    packed_dir: Path
+    shard_size: int
+    local_data_file: Path
+    extract_mode: str
+    read_workers: int
+    params_image_size: list
  
 @dataclass(frozen=True)
 class PrepareBaseModelConfig:
@@ -18,6 +32,11 @@ class PrepareBaseModelConfig:
     params_include_top: bool
     params_weights: str
     params_classes: int
+    params_precision: str
+    params_head_type: str
+    params_head_units: int
+    params_head_dropout: float
+    params_backbone: str
 
 @dataclass(frozen=True)
 class PrepareCallbacksConfig:
@@ -31,16 +50,109 @@ class TrainingConfig:
     trained_model_path: Path
     updated_base_model_path: Path
     training_data: Path
+    packed_data: Path
     params_epochs: int
     params_batch_size: int
     params_image_size: list
     params_is_augmentation: bool
+    feature_cache_dir: Path
+    params_feature_cache: bool
+    params_feature_cache_copies: int
+    params_data_pipeline: str
+    params_cache_validation: bool
+    params_learning_rate: float
+    params_jit_compile: bool
+    params_steps_per_execution: int
+    params_run_eagerly: bool
+    params_precision: str
 
 @dataclass(frozen=True)
 class EvaluationConfig:
     path_of_model: Path
     training_data: Path
+    packed_data: Path
     all_params: dict
     params_image_size: list
+    params_eval_batch_size: int
+    params_data_pipeline: str
+    params_precision: str
+    
+@dataclass(frozen=True)
+class ModelQuantizationConfig:
+    root_dir: Path
+    trained_model_path: Path
+    fp16_model_path: Path
+    int8_model_path: Path
+    scores_path: Path
+    training_data: Path
+    packed_data: Path
+    params_image_size: list
+    params_batch_size: int
+    params_calibration_samples: int
+
+@dataclass(frozen=True)
+class DistillationConfig:
+    root_dir: Path
+    teacher_model_path: Path
+    student_model_path: Path
+    scores_path: Path
+    training_data: Path
+    packed_data: Path
+    params_image_size: list
     params_batch_size: int
-    
\ No newline at end of file
+    params_classes: int
+    params_is_augmentation: bool
+    params_data_pipeline: str
+    params_epochs: int
+    params_learning_rate: float
+    params_temperature: float
+    params_alpha: float
+    params_student_filters: list
+
+@dataclass(frozen=True)
+class ModelRegistryConfig:
+    root_dir: Path
+    keep_versions: int
+    scores_path: Path
+    artifacts: dict
+
+@dataclass(frozen=True)
+class SweepConfig:
+    root_dir: Path
+    summary_path: Path
+    config_filepath: Path
+    params_filepath: Path
+    method: str
+    num_trials: int
+    seed: int
+    workers: int
+    threads_per_trial: int
+    metric: str
+    keep_models: bool
+    fixed_params: dict
+    search_space: dict
+
+@dataclass(frozen=True)
+class ServingConfig:
+    backend: str
+    num_threads: int
+    max_batch_size: int
+    max_wait_ms: float
+    batch_chunk_size: int
+    ready_timeout_s: float
+    jit_compile: bool
+    warmup_runs: int
+    workers: int
+    worker_threads: int
+    intra_op_threads: int
+    inter_op_threads: int
+    cache_size: int
+    cache_ttl_s: float
+    precision: str
+    model: str
+    registry_dir: Path
+    registry_poll_s: float
+    shadow_heads: list
+    ab_head: str
+    ab_fraction: float
+    training_jobs_dir: Path
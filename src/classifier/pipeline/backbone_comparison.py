@@ -0,0 +1,33 @@
+from classifier.config.configuration import ConfigurationManager
+from classifier.components.hyperparameter_sweep import HyperparameterSweep
+from classifier.pipeline.runner import StageRunner
+from classifier import logger
+
+
+STAGE_NAME = "Backbone Comparison Stage"
+
+class BackboneComparisonPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        try:
+            logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
+            # every backbone is scored on the same packed dataset, the
+            # configured BACKBONE reuses the prepared base model
+            StageRunner().run(end="prepare_base_model")
+
+            config = ConfigurationManager()
+            backbone_comparison_config = config.get_backbone_comparison_config()
+            comparison = HyperparameterSweep(config=backbone_comparison_config)
+            comparison.run()
+            comparison.summarize()
+
+            logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+        except Exception as e:
+            logger.exception(e)
+            raise e
+
+if __name__ == "__main__":
+    pipeline = BackboneComparisonPipeline()
+    pipeline.main()
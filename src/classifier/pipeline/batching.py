@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from classifier import logger
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests into a single forward pass.
+
+    Request threads decode and preprocess their own image, then park on a
+    Future. One worker thread drains the queue, flushing as soon as it holds
+    `max_batch_size` images or the oldest one has waited `max_wait_ms`.
+
+    Images queued before `stop` are still batched; a request that reaches a
+    stopped batcher (e.g. one being swapped out) runs on its own thread.
+    """
+
+    def __init__(self, pipeline, max_batch_size=16, max_wait_ms=5):
+        self.pipeline = pipeline
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._stopped = False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="micro-batcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            if self._thread is None:
+                return
+            self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, img) -> Future:
+        # decoding happens on the caller's thread so it overlaps across requests
+        future = Future()
+        array = self.pipeline.preprocess(img)
+        with self._lock:
+            if not self._stopped:
+                self._queue.put((array, future))
+                return future
+        future.set_result(self.pipeline.predict_array(array[np.newaxis])[0])
+        return future
+
+    def predict(self, img):
+        # same return shape as PredictionPipeline.predict
+        return [self.submit(img).result()]
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # keep the stop sentinel for the outer loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = self._collect(first)
+            futures = [future for _, future in batch]
+            try:
+                results = self.pipeline.predict_array(
+                    np.stack([array for array, _ in batch])
+                )
+            except Exception as e:
+                logger.exception(e)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import tensorflow as tf
+from classifier import logger
+from classifier.config.configuration import ConfigurationManager
+
+
+class ArtifactWriter:
+    """
+    Saves models in a background thread so the next stage can start right away.
+
+    The weights are copied when `save_model` is called, so the artifact holds
+    the model as it was at that point even if training keeps updating it.
+    Files are written under a temporary name and moved into place, so readers
+    never see a half-written model.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+        self._pending = {}
+
+    def save_model(self, path: Path, model: tf.keras.Model):
+        path = Path(path)
+        self.wait([path])
+        # architecture (incl. trainable flags), weights and compile settings as of now
+        snapshot = {
+            "cls": type(model),
+            "config": model.get_config(),
+            "weights": model.get_weights(),
+            "compile": None
+        }
+        if getattr(model, "optimizer", None) is not None:
+            snapshot["compile"] = dict(
+                optimizer=model.optimizer.__class__.from_config(model.optimizer.get_config()),
+                loss=model.loss,
+                metrics=["accuracy"]
+            )
+        self._pending[str(path)] = self._executor.submit(self._write, path, snapshot)
+
+    @staticmethod
+    def _write(path: Path, snapshot: dict):
+        model = snapshot["cls"].from_config(snapshot["config"])
+        model.set_weights(snapshot["weights"])
+        if snapshot["compile"] is not None:
+            # same training setup as the live model, fresh optimizer state
+            model.compile(**snapshot["compile"])
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")
+        model.save(tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Model saved at: {path}")
+
+    def wait(self, paths=None):
+        """Blocks until the given paths (all pending writes by default) are on disk."""
+        keys = list(self._pending) if paths is None else [str(Path(p)) for p in paths]
+        for key in keys:
+            future = self._pending.pop(key, None)
+            if future is not None:
+                future.result()
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+
+class PipelineContext:
+    """
+    State shared by the stages of an in-process run.
+
+    Each stage leaves the live objects it built here (the prepared and
+    trained models, callbacks and generators) for the stages after it, which
+    fall back to the saved artifacts when a field is None, e.g. because the
+    stage that fills it was skipped.
+    """
+
+    def __init__(self, config: ConfigurationManager = None, writer: ArtifactWriter = None):
+        self.config = config or ConfigurationManager()
+        self.writer = writer or ArtifactWriter()
+        self.base_model = None
+        self.trained_model = None
+        self.callback_list = None
+        self.train_generator = None
+        self.valid_generator = None
@@ -0,0 +1,32 @@
+from classifier.config.configuration import ConfigurationManager
+from classifier.components.hyperparameter_sweep import HyperparameterSweep
+from classifier.pipeline.runner import StageRunner
+from classifier import logger
+
+
+STAGE_NAME = "Hyperparameter Sweep Stage"
+
+class HyperparameterSweepPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        try:
+            logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
+            # the trials share the packed dataset and the prepared base model
+            StageRunner().run(end="prepare_base_model")
+
+            config = ConfigurationManager()
+            sweep_config = config.get_sweep_config()
+            sweep = HyperparameterSweep(config=sweep_config)
+            sweep.run()
+            sweep.summarize()
+
+            logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+        except Exception as e:
+            logger.exception(e)
+            raise e
+
+if __name__ == "__main__":
+    pipeline = HyperparameterSweepPipeline()
+    pipeline.main()
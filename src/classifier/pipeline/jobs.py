@@ -0,0 +1,244 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import fcntl
+import signal
+import threading
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from classifier import logger
+
+STAGE_PATTERN = re.compile(r">>>>>> Stage (.+?) (started|completed) <<<<<<")
+EPOCH_PATTERN = re.compile(r"Epoch (\d+)/(\d+)")
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class TrainingJob:
+    def __init__(self, command):
+        self.id = uuid.uuid4().hex
+        self.command = command
+        self.status = "queued"
+        self.stage = None
+        self.epoch = None
+        self.epochs = None
+        self.returncode = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # the child's pid, so any server process can cancel it
+        self.pid = None
+        self.cancel_requested = False
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "epoch": self.epoch,
+            "epochs": self.epochs,
+            "returncode": self.returncode,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+    def to_state(self) -> dict:
+        return {**self.to_dict(), "command": self.command, "pid": self.pid, "cancel_requested": self.cancel_requested}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TrainingJob":
+        job = cls(state["command"])
+        job.id = state["job_id"]
+        for key in ("status", "stage", "epoch", "epochs", "returncode", "created_at",
+                    "started_at", "finished_at", "pid", "cancel_requested"):
+            setattr(job, key, state[key])
+        return job
+
+
+class TrainingJobManager:
+    """
+    Runs main.py in a child process, one job at a time, off the request thread.
+
+    Jobs are kept as one JSON file each under `state_dir`, so every gunicorn
+    worker sharing that directory sees and can cancel every job. Whichever
+    worker holds the flock on runner.lock runs the queue; the others wait on
+    it, so only one main.py runs at a time across all of them.
+
+    Progress is parsed from the stage banners main.py logs and from Keras'
+    "Epoch i/n" lines. The child runs at a lower CPU priority so prediction
+    traffic in the serving process keeps its latency.
+    """
+
+    def __init__(self, state_dir, command=None, niceness=10, max_history=50, on_success=None):
+        self.state_dir = Path(state_dir)
+        self.command = command or [sys.executable, "main.py"]
+        # called with the job after a successful run, e.g. to load the new model
+        self.on_success = on_success
+        self.niceness = niceness
+        self.max_history = max_history
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    @contextmanager
+    def _flock(self, name):
+        # flock is per open file, so it also orders threads of one process
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.state_dir / name, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _path(self, job_id) -> Path:
+        return self.state_dir / f"{job_id}.json"
+
+    def _read(self, job_id):
+        if not JOB_ID_PATTERN.fullmatch(job_id) or not self._path(job_id).exists():
+            return None
+        with open(self._path(job_id)) as f:
+            return TrainingJob.from_state(json.load(f))
+
+    def _write(self, job):
+        tmp_path = self.state_dir / f".{job.id}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job.to_state(), f, indent=4)
+        os.replace(tmp_path, self._path(job.id))
+
+    def _all(self) -> list:
+        jobs = (self._read(path.stem) for path in self.state_dir.glob("*.json"))
+        return [job for job in jobs if job is not None]
+
+    def _update(self, job_id, **fields) -> TrainingJob:
+        # read-modify-write, so a cancel from another process is not overwritten
+        with self._flock("state.lock"):
+            job = self._read(job_id)
+            for key, value in fields.items():
+                setattr(job, key, value)
+            self._write(job)
+        return job
+
+    def submit(self) -> TrainingJob:
+        job = TrainingJob(self.command)
+        with self._flock("state.lock"):
+            self._write(job)
+            self._trim_history()
+        with self._lock:
+            # started lazily so it exists in the process that serves requests
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="training-jobs", daemon=True)
+                self._worker.start()
+        self._wakeup.set()
+        logger.info(f"Training job {job.id} queued")
+        return job
+
+    def get(self, job_id):
+        return self._read(job_id)
+
+    def cancel(self, job_id) -> bool:
+        with self._flock("state.lock"):
+            job = self._read(job_id)
+            if job is None or job.status not in ("queued", "running"):
+                return False
+
+            job.cancel_requested = True
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            self._write(job)
+
+        if job.status == "running" and job.pid is not None:
+            # the child may belong to another worker, signal it directly
+            try:
+                os.kill(job.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        logger.info(f"Training job {job.id} cancellation requested")
+        return True
+
+    def _trim_history(self):
+        finished = [j for j in self._all() if j.finished_at is not None]
+        excess = max(0, len(finished) + 1 - self.max_history)
+        for job in sorted(finished, key=lambda j: j.finished_at)[:excess]:
+            self._path(job.id).unlink(missing_ok=True)
+
+    def _next_job(self):
+        """Called holding runner.lock: claims the oldest queued job, None once the queue is empty."""
+        with self._flock("state.lock"):
+            jobs = self._all()
+            for job in jobs:
+                # nobody else holds runner.lock, so its runner died mid-job
+                if job.status == "running":
+                    job.status, job.finished_at = "failed", time.time()
+                    self._write(job)
+
+            queued = sorted((j for j in jobs if j.status == "queued"), key=lambda j: j.created_at)
+            if not queued:
+                return None
+            job = queued[0]
+            job.status, job.started_at = "running", time.time()
+            self._write(job)
+            return job
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # blocks while another server process is running the queue
+            with self._flock("runner.lock"):
+                while (job := self._next_job()) is not None:
+                    self._execute(job)
+
+    def _execute(self, job):
+        status = "failed"
+        try:
+            process = subprocess.Popen(
+                job.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                env={**os.environ, "PYTHONUNBUFFERED": "1"}
+            )
+            if self.niceness and hasattr(os, "setpriority"):
+                os.setpriority(os.PRIO_PROCESS, process.pid, self.niceness)
+            job = self._update(job.id, pid=process.pid)
+            if job.cancel_requested:
+                process.terminate()
+
+            for line in process.stdout:
+                progress = self._parse_progress(line)
+                if progress:
+                    job = self._update(job.id, **progress)
+
+            returncode = process.wait()
+            job = self._update(job.id, returncode=returncode)
+            if job.cancel_requested:
+                status = "cancelled"
+            else:
+                status = "succeeded" if returncode == 0 else "failed"
+
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            job = self._update(job.id, status=status, pid=None, finished_at=time.time())
+            logger.info(f"Training job {job.id} finished with status {job.status}")
+
+        if job.status == "succeeded" and self.on_success is not None:
+            self.on_success(job)
+
+    @staticmethod
+    def _parse_progress(line) -> dict:
+        stage = STAGE_PATTERN.search(line)
+        if stage:
+            return {"stage": stage.group(1)}
+
+        epoch = EPOCH_PATTERN.search(line)
+        if epoch:
+            return {"epoch": int(epoch.group(1)), "epochs": int(epoch.group(2))}
+        return {}
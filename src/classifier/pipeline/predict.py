@@ -1,50 +1,339 @@
+import io
+import sys
+import time
+import json
 import numpy as np
+import tensorflow as tf
 from tensorflow.keras.models import load_model
 from tensorflow.keras.preprocessing import image
 import os
+import random
+import threading
+from classifier import logger
+from classifier.components.model_quantization import TFLiteModel
+from classifier.components.prepare_base_model import PrepareBaseModel
+from classifier.utils.precision import apply_precision
+from classifier.utils.backbones import get_preprocessing, load_metadata
+
+BACKENDS = ("keras", "tflite-fp16", "tflite-int8")
+
+# name of the served model's own head when shadow heads run next to it
+PRIMARY_HEAD = "primary"
+
+# Labels: Using a dictionary is cleaner and faster than if-else
+LABEL_MAP = {
+    0: 'You have Glioma Brain Tumor, Get urgent attention!',
+    1: 'You are healthy',
+    2: 'You have Meningioma Brain Tumor, Get urgent attention!',
+    3: 'You have Pituitary Tumor, Get urgent attention!'
+}
 
 class PredictionPipeline:
-    def __init__(self, model_path, target_size=(224, 224)):
+    def __init__(self, model_path, target_size=(224, 224), jit_compile=False,
+                 backend="keras", num_threads=None, precision="float32", model_version=None,
+                 shadow_heads=None, ab_head=None, ab_fraction=0.0):
         # 1. Verification: Ensure model actually exists before trying to load
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found at: {model_path}")
-            
-        self.model = load_model(model_path)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
+        self.backend = backend
         self.target_size = target_size
+        # the registry version, returned with every prediction
+        self.model_version = model_version
+        # the preprocessing of the model's backbone, /255 for models without a sidecar
+        self.preprocess_input = get_preprocessing(model_path)
+
+        self.heads = None
+        if shadow_heads and backend != "keras":
+            raise ValueError("Shadow heads need the keras backend")
+
+        if backend == "keras":
+            # mixed_bfloat16 computes in bf16 with float32 inputs and softmax output
+            self.model = apply_precision(load_model(model_path), precision)
+            signature = [tf.TensorSpec([None, *target_size, 3], tf.float32)]
+
+            if shadow_heads:
+                self._load_heads(model_path, shadow_heads, precision)
+                if ab_head is not None and ab_head not in shadow_heads:
+                    raise ValueError(f"A/B head '{ab_head}' is not one of the shadow heads {list(shadow_heads)}")
+                self.ab_head = ab_head
+                self.ab_fraction = float(ab_fraction) if ab_head else 0.0
+                self._random = random.Random()
+                self._stats_lock = threading.Lock()
+                self._head_stats = {name: {"images": 0, "answered": 0, "agreements": 0} for name in self.heads}
+
+                # the backbone runs once per batch, every head reads its features
+                self._infer_heads = tf.function(
+                    lambda batch: self._run_heads(batch),
+                    input_signature=signature,
+                    jit_compile=jit_compile
+                )
+                self._infer = lambda batch: self._infer_heads(batch)[0]
+            else:
+                # one traced graph for every call instead of Model.predict's per-call
+                # data adapter and step function setup
+                self._infer = tf.function(
+                    lambda batch: self.model(batch, training=False),
+                    input_signature=signature,
+                    jit_compile=jit_compile
+                )
+        else:
+            # quantized .tflite artifact from the model quantization stage
+            self.model = None
+            self._infer = TFLiteModel(model_path, num_threads=num_threads)
+
+    def _load_heads(self, model_path, shadow_heads, precision):
+        """
+        Puts the served model's head and every shadow head on one backbone.
+
+        A shadow model must have been trained on the same frozen backbone
+        (identical weights) and preprocessing; only its head layers are kept.
+
+        Args:
+            model_path: the served (primary) model.
+            shadow_heads (dict): head name -> path of a model to take the head from.
+            precision (str): dtype policy of every head.
+        """
+        self.backbone, head_layers = PrepareBaseModel.split_backbone_head(self.model)
+        feature_shape = self.backbone.output_shape[1:]
+        backbone_weights = self.backbone.get_weights()
+        preprocessing = load_metadata(model_path)["preprocessing"]
+        self.heads = {PRIMARY_HEAD: PrepareBaseModel.build_head(feature_shape, head_layers)}
+
+        for name, path in shadow_heads.items():
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Shadow model file not found at: {path}")
+            if load_metadata(path)["preprocessing"] != preprocessing:
+                raise ValueError(f"Shadow head '{name}' expects other inputs than the served model")
+
+            backbone, head_layers = PrepareBaseModel.split_backbone_head(
+                apply_precision(load_model(path), precision)
+            )
+            weights = backbone.get_weights()
+            if len(weights) != len(backbone_weights) or not all(
+                np.array_equal(a, b) for a, b in zip(weights, backbone_weights)
+            ):
+                raise ValueError(f"Shadow head '{name}' was trained on another backbone than the served model")
+            # the shadow's own backbone is dropped here, only the head layers stay
+            self.heads[name] = PrepareBaseModel.build_head(feature_shape, head_layers)
+        logger.info(f"Serving {PRIMARY_HEAD} head with shadow heads {list(shadow_heads)} on one backbone")
+
+    def _run_heads(self, batch):
+        features = self.backbone(batch, training=False)
+        return [head(features, training=False) for head in self.heads.values()]
+
+    def head_stats(self):
+        """
+        Returns:
+            dict: per head, the images it scored, the ones it answered and
+                how often it agreed with the primary head; None without shadows.
+        """
+        if self.heads is None:
+            return None
+        with self._stats_lock:
+            return {
+                name: {
+                    **stats,
+                    "agreement_rate": stats["agreements"] / stats["images"] if stats["images"] else 0.0
+                }
+                for name, stats in self._head_stats.items()
+            }
+
+    def warmup(self, batch_sizes=(1,), runs=2):
+        """
+        Traces (and with XLA, compiles) the inference function ahead of traffic.
+
+        Args:
+            batch_sizes (tuple): batch sizes to run; XLA compiles once per shape.
+            runs (int): passes per batch size.
+        """
+        for batch_size in batch_sizes:
+            batch = np.zeros((batch_size, *self.target_size, 3), dtype="float32")
+            for _ in range(runs):
+                self._infer(batch)
+
+    def benchmark(self, runs=50):
+        """
+        Measures single-image latency of the serving backend (and Model.predict for keras).
+
+        Returns:
+            dict: p50/p99 in milliseconds for each path.
+        """
+        batch = np.zeros((1, *self.target_size, 3), dtype="float32")
+        self.warmup()
+
+        def timed(fn):
+            latencies = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                fn(batch)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            return {"p50_ms": round(float(p50), 2), "p99_ms": round(float(p99), 2)}
+
+        report = {self.backend: timed(lambda x: np.asarray(self._infer(x)))}
+        if self.model is not None:
+            report["model_predict"] = timed(lambda x: self.model.predict(x, verbose=0))
+        return report
+
+    def load_image(self, img):
+        """
+        Decodes an image into a (height, width, 3) float array without touching disk.
+
+        Args:
+            img: raw encoded bytes, a file-like object (e.g. the upload stream),
+                a path on disk, or an already decoded NumPy array.
+
+        Returns:
+            np.ndarray: the image resized to `target_size`, not yet normalized.
+        """
+        if isinstance(img, np.ndarray):
+            if img.shape[:2] != tuple(self.target_size):
+                img = image.smart_resize(img, self.target_size)
+            return img.astype("float32")
+
+        if isinstance(img, (bytes, bytearray)):
+            img = io.BytesIO(img)
+        elif hasattr(img, "read") and not isinstance(img, io.BytesIO):
+            # keras' load_img only accepts paths or io.BytesIO
+            img = io.BytesIO(img.read())
+
+        # 2. Loading: decode straight from memory (or a path for local use)
+        test_image = image.load_img(img, target_size=self.target_size)
 
-    def predict(self, img_path):
-        # 2. Loading: 'img_path' will be a temporary path in /tmp (safe for Cloud Run)
-        test_image = image.load_img(img_path, target_size=self.target_size)
-        
         # 3. Conversion: Convert PIL image to NumPy array
-        test_image = image.img_to_array(test_image)
-        
-        # 4. Batching: Expand dims to make it (1, 224, 224, 3)
-        test_image = np.expand_dims(test_image, axis=0)
+        return image.img_to_array(test_image)
+
+    def preprocess(self, img):
+        """Decodes and normalizes one image into a (224, 224, 3) model input."""
+        test_image = self.load_image(img)
 
         # =========================================================================
         # CRITICAL CHECK: Normalization
-        # Most models trained on standard data need inputs between 0 and 1.
-        # If your training code used `Rescaling(1./255)`, UNCOMMENT the line below.
-        # If you leave this commented out and your model expects 0-1, 
-        # your predictions will be wrong (random).
-        
-        test_image = test_image / 255.0
+        # Inputs must be normalized exactly like the training data, or the
+        # predictions will be wrong (random). That is the backbone's own
+        # preprocess_input, recorded in the sidecar .json next to the model;
+        # models saved before it existed were trained on /255 inputs.
+
+        test_image = self.preprocess_input(test_image)
         # =========================================================================
+        return test_image
+
+    def predict_array(self, batch):
+        """
+        Runs one forward pass over an already preprocessed batch.
+
+        Args:
+            batch (np.ndarray): stacked inputs of shape (N, 224, 224, 3).
+
+        Returns:
+            list: one {"prediction", "confidence", "model_version"} dict per row,
+                plus the "head" that answered when shadow heads are loaded.
+        """
+        batch = np.asarray(batch, dtype="float32")
+        if self.heads is not None:
+            return self._predict_heads(batch)
+
+        probs = np.asarray(self._infer(batch))
+        result_indices = np.argmax(probs, axis=1)
+        confidences = np.max(probs, axis=1)
+
+        return [
+            {
+                "prediction": LABEL_MAP.get(int(index), 'Unknown Label'),
+                "confidence": float(confidence),
+                "model_version": self.model_version
+            }
+            for index, confidence in zip(result_indices, confidences)
+        ]
+
+    def _predict_heads(self, batch):
+        """
+        Answers each row from the primary head, or from the A/B head for
+        `ab_fraction` of the rows, and logs every other head's prediction.
+        """
+        names = list(self.heads)
+        probs = {name: np.asarray(output) for name, output in zip(names, self._infer_heads(batch))}
+        indices = {name: np.argmax(p, axis=1) for name, p in probs.items()}
+        primary = indices[PRIMARY_HEAD]
+
+        results = []
+        for row in range(len(batch)):
+            head = PRIMARY_HEAD
+            if self.ab_head is not None and self._random.random() < self.ab_fraction:
+                head = self.ab_head
+            results.append({
+                "prediction": LABEL_MAP.get(int(indices[head][row]), 'Unknown Label'),
+                "confidence": float(probs[head][row, indices[head][row]]),
+                "model_version": self.model_version,
+                "head": head
+            })
+
+            shadows = ", ".join(
+                f"{name}={indices[name][row]} ({probs[name][row, indices[name][row]]:.3f})"
+                for name in names if name != head
+            )
+            logger.info(f"{head}={indices[head][row]} ({results[-1]['confidence']:.3f}), shadows: {shadows}")
+
+            with self._stats_lock:
+                for name in names:
+                    stats = self._head_stats[name]
+                    stats["images"] += 1
+                    stats["answered"] += name == head
+                    stats["agreements"] += bool(indices[name][row] == primary[row])
+        return results
+
+    def predict(self, img):
+        # Batching: Expand dims to make it (1, 224, 224, 3)
+        test_image = np.expand_dims(self.preprocess(img), axis=0)
+        return self.predict_array(test_image)
+
+    def predict_chunks(self, images, chunk_size=32):
+        """
+        Scores an iterable of images in vectorized chunks.
+
+        Images that fail to decode are reported individually instead of
+        failing the whole chunk.
+
+        Args:
+            images: iterable of anything `load_image` accepts.
+            chunk_size (int): number of images per forward pass.
+
+        Yields:
+            list: per-image result dicts (with their "index") for each chunk.
+        """
+        chunk_size = max(1, int(chunk_size))
+        pending, errors = [], []
+
+        def flush():
+            results = list(errors)
+            if pending:
+                batch = np.stack([array for _, array in pending])
+                for (index, _), result in zip(pending, self.predict_array(batch)):
+                    results.append({"index": index, **result})
+            pending.clear()
+            errors.clear()
+            return sorted(results, key=lambda r: r["index"])
+
+        for index, img in enumerate(images):
+            try:
+                pending.append((index, self.preprocess(img)))
+            except Exception as e:
+                errors.append({"index": index, "error": str(e)})
+
+            if len(pending) + len(errors) >= chunk_size:
+                yield flush()
+
+        if pending or errors:
+            yield flush()
+
 
-        # 5. Prediction
-        probs = self.model.predict(test_image)
-        result_index = np.argmax(probs, axis=1)[0]
-        confidence = float(np.max(probs, axis=1)[0])
-
-        # 6. Labels: Using a dictionary is cleaner and faster than if-else
-        label_map = {
-            0: 'You have Glioma Brain Tumor, Get urgent attention!',
-            1: 'You are healthy',
-            2: 'You have Meningioma Brain Tumor, Get urgent attention!',
-            3: 'You have Pituitary Tumor, Get urgent attention!'
-        }
-        
-        prediction = label_map.get(result_index, 'Unknown Label')
-
-        return [{"prediction": prediction, "confidence": confidence}]
\ No newline at end of file
+if __name__ == "__main__":
+    # python src/classifier/pipeline/predict.py <model_path> [keras|tflite-fp16|tflite-int8] [float32|mixed_bfloat16]
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "artifacts/training/trained_model.h5"
+    backend = sys.argv[2] if len(sys.argv) > 2 else "keras"
+    precision = sys.argv[3] if len(sys.argv) > 3 else "float32"
+    pipeline = PredictionPipeline(model_path=model_path, backend=backend, precision=precision)
+    print(json.dumps(pipeline.benchmark(), indent=4))
@@ -0,0 +1,269 @@
+import os
+import json
+import hashlib
+import importlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from classifier import logger
+from classifier.constants import *
+from classifier.utils.common import read_yaml
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass(frozen=True)
+class StageSpec:
+    name: str
+    title: str
+    pipeline: str
+    config_sections: list
+    params: list
+    code: list
+    deps: list = field(default_factory=list)
+    outs: list = field(default_factory=list)
+
+
+def build_stages(config) -> list:
+    """The pipeline in execution order, with everything each stage depends on."""
+    ingestion = config.data_ingestion
+    dataset_dir = os.path.join(ingestion.unzip_dir, "brain_tumor_dataset")
+    data_deps = [ingestion.packed_dir, dataset_dir]
+    ingestion_outs = [ingestion.local_data_file, ingestion.packed_dir]
+    if ingestion.extract_mode != "stream":
+        # stream mode reads the zip and leaves nothing unzipped
+        ingestion_outs.append(dataset_dir)
+    return [
+        StageSpec(
+            name="data_ingestion",
+            title="Data Ingestion Stage",
+            pipeline="classifier.pipeline.stage_01_data_ingestion:DataIngestionPipeline",
+            config_sections=["data_ingestion"],
+            params=["IMAGE_SIZE"],
+            code=["pipeline/stage_01_data_ingestion.py", "components/data_ingestion.py",
+                  "components/dataset_packing.py", "components/data_loader.py"],
+            outs=ingestion_outs
+        ),
+        StageSpec(
+            name="prepare_base_model",
+            title="Prepare Base Model Stage",
+            pipeline="classifier.pipeline.stage_02_prepare_base_model:PrepareBaseModelPipeline",
+            config_sections=["prepare_base_model"],
+            params=["IMAGE_SIZE", "INCLUDE_TOP", "CLASSES", "BACKBONE", "WEIGHTS", "LEARNING_RATE",
+                    "PRECISION", "HEAD_TYPE", "HEAD_UNITS", "HEAD_DROPOUT"],
+            code=["pipeline/stage_02_prepare_base_model.py", "components/prepare_base_model.py",
+                  "utils/backbones.py"],
+            outs=[config.prepare_base_model.base_model_path,
+                  config.prepare_base_model.updated_base_model_path]
+        ),
+        StageSpec(
+            name="prepare_callbacks",
+            title="Prepare Callbacks Stage",
+            pipeline="classifier.pipeline.stage_03_prepare_callbacks:PrepareCallbacksPipeline",
+            config_sections=["prepare_callbacks"],
+            params=[],
+            code=["pipeline/stage_03_prepare_callbacks.py", "components/prepare_callbacks.py"]
+        ),
+        StageSpec(
+            name="training",
+            title="Training Stage",
+            pipeline="classifier.pipeline.stage_04_training:ModelTrainingPipeline",
+            config_sections=["training", "prepare_callbacks"],
+            params=["IMAGE_SIZE", "EPOCHS", "BATCH_SIZE", "AUGMENTATION", "LEARNING_RATE", "FEATURE_CACHE",
+                    "FEATURE_CACHE_COPIES", "DATA_PIPELINE", "CACHE_VALIDATION",
+                    "JIT_COMPILE", "STEPS_PER_EXECUTION", "RUN_EAGERLY", "PRECISION"],
+            code=["pipeline/stage_04_training.py", "components/training.py",
+                  "components/prepare_callbacks.py", "components/data_loader.py",
+                  "components/prepare_base_model.py", "utils/backbones.py"],
+            deps=[config.prepare_base_model.updated_base_model_path] + data_deps,
+            outs=[config.training.trained_model_path]
+        ),
+        StageSpec(
+            name="evaluation",
+            title="Evaluation Stage",
+            pipeline="classifier.pipeline.stage_05_evaluation:EvaluationPipeline",
+            config_sections=[],
+            params=["IMAGE_SIZE", "EVAL_BATCH_SIZE", "DATA_PIPELINE", "PRECISION"],
+            code=["pipeline/stage_05_evaluation.py", "components/evaluation.py",
+                  "components/data_loader.py", "utils/backbones.py"],
+            deps=[config.training.trained_model_path] + data_deps,
+            outs=["scores.json"]
+        ),
+        StageSpec(
+            name="model_quantization",
+            title="Model Quantization Stage",
+            pipeline="classifier.pipeline.stage_06_model_quantization:ModelQuantizationPipeline",
+            config_sections=["model_quantization"],
+            params=["IMAGE_SIZE", "BATCH_SIZE", "CALIBRATION_SAMPLES"],
+            code=["pipeline/stage_06_model_quantization.py", "components/model_quantization.py",
+                  "utils/backbones.py"],
+            deps=[config.training.trained_model_path, dataset_dir],
+            outs=[config.model_quantization.fp16_model_path,
+                  config.model_quantization.int8_model_path,
+                  config.model_quantization.scores_path]
+        ),
+        StageSpec(
+            name="distillation",
+            title="Distillation Stage",
+            pipeline="classifier.pipeline.stage_07_distillation:DistillationPipeline",
+            config_sections=["distillation"],
+            params=["IMAGE_SIZE", "BATCH_SIZE", "CLASSES", "AUGMENTATION", "DATA_PIPELINE",
+                    "EVAL_BATCH_SIZE", "PRECISION", "STUDENT_FILTERS", "DISTILL_EPOCHS",
+                    "DISTILL_LEARNING_RATE", "DISTILL_TEMPERATURE", "DISTILL_ALPHA"],
+            code=["pipeline/stage_07_distillation.py", "components/distillation.py",
+                  "components/evaluation.py", "components/data_loader.py", "utils/backbones.py"],
+            deps=[config.training.trained_model_path] + data_deps,
+            outs=[config.distillation.student_model_path, config.distillation.scores_path]
+        ),
+        StageSpec(
+            name="model_registry",
+            title="Model Registry Stage",
+            pipeline="classifier.pipeline.stage_08_model_registry:ModelRegistryPipeline",
+            config_sections=["model_registry"],
+            params=[],
+            code=["pipeline/stage_08_model_registry.py", "components/model_registry.py"],
+            # a new version whenever any serving artifact changed
+            deps=[config.training.trained_model_path, "scores.json",
+                  config.distillation.student_model_path,
+                  config.model_quantization.fp16_model_path,
+                  config.model_quantization.int8_model_path],
+            outs=[os.path.join(config.model_registry.root_dir, "current")]
+        ),
+    ]
+
+
+def _hash_path(digest, path: Path):
+    """Code and model files are hashed by content, data directories by file listing and stat."""
+    if not path.exists():
+        digest.update(f"{path}:missing".encode())
+    elif path.is_dir():
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                rel = os.path.relpath(os.path.join(root, name), path)
+                digest.update(f"{rel}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    else:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+
+
+def _overlaps(a, b) -> bool:
+    """Whether one path is, or lies inside, the other."""
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+class StageRunner:
+    """
+    Runs the pipeline stages in order and skips the ones that are up to date.
+
+    A stage is up to date when its outputs exist and the fingerprint of its
+    inputs matches the stamp left by its last successful run. The inputs are
+    its config.yaml sections, the params.yaml keys it reads, its code and its
+    upstream artifacts.
+    """
+
+    def __init__(self, config_filepath=CONFIG_FILE_PATH, params_filepath=PARAMS_FILE_PATH):
+        self.config = read_yaml(config_filepath)
+        self.params = read_yaml(params_filepath)
+        self.stages = build_stages(self.config)
+        self.stamp_dir = Path(self.config.artifacts_root) / ".stages"
+
+    @property
+    def stage_names(self) -> list:
+        return [stage.name for stage in self.stages]
+
+    def select(self, stage=None, start=None, end=None) -> list:
+        names = self.stage_names
+        for name in (stage, start, end):
+            if name is not None and name not in names:
+                raise ValueError(f"Unknown stage '{name}', expected one of {names}")
+        if stage is not None:
+            return [self.stages[names.index(stage)]]
+
+        first = names.index(start) if start else 0
+        last = names.index(end) if end else len(names) - 1
+        return self.stages[first:last + 1]
+
+    def fingerprint(self, stage: StageSpec) -> str:
+        digest = hashlib.sha256()
+        inputs = {
+            "config": {section: self.config.get(section) for section in stage.config_sections},
+            "params": {key: self.params.get(key) for key in stage.params}
+        }
+        digest.update(json.dumps(inputs, sort_keys=True, default=str).encode())
+        for code in stage.code:
+            _hash_path(digest, PACKAGE_DIR / code)
+        for dep in stage.deps:
+            _hash_path(digest, Path(dep))
+        return digest.hexdigest()
+
+    def _stamp_path(self, stage: StageSpec) -> Path:
+        return self.stamp_dir / f"{stage.name}.json"
+
+    def is_up_to_date(self, stage: StageSpec, fingerprint: str) -> bool:
+        stamp = self._stamp_path(stage)
+        if not stamp.exists() or not all(os.path.exists(out) for out in stage.outs):
+            return False
+        with open(stamp) as f:
+            return json.load(f).get("fingerprint") == fingerprint
+
+    def run_stage(self, stage: StageSpec, context=None):
+        # the stage banners are logged by run(), a stage's main() does not log
+        # them (only its script does, when run on its own by dvc)
+        module_name, class_name = stage.pipeline.split(":")
+        pipeline = getattr(importlib.import_module(module_name), class_name)()
+        if context is None:
+            pipeline.main()
+        else:
+            pipeline.main(context=context)
+
+    def _write_stamp(self, stage: StageSpec):
+        # inputs are fingerprinted again, the stage may have produced some
+        self.stamp_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._stamp_path(stage), "w") as f:
+            json.dump({"fingerprint": self.fingerprint(stage)}, f)
+
+    def run(self, stage=None, start=None, end=None, force=False, in_memory=False):
+        """
+        Runs the selected stages. With `in_memory`, stages hand the live model
+        to each other through a PipelineContext instead of reloading it, and
+        models are saved in the background while later stages run. A stage
+        reading outputs of a stage that ran in this run is run without an
+        up-to-date check, its inputs may still be being written; the stamps
+        are fingerprinted once every save has finished.
+        """
+        context = None
+        if in_memory:
+            from classifier.pipeline.context import PipelineContext
+            context = PipelineContext()
+
+        completed = []
+        produced = []
+        try:
+            for spec in self.select(stage, start, end):
+                downstream = any(_overlaps(dep, out) for dep in spec.deps for out in produced)
+                if not (force or downstream) and self.is_up_to_date(spec, self.fingerprint(spec)):
+                    logger.info(f">>>>>> Stage {spec.title} skipped, outputs are up to date <<<<<<")
+                    continue
+
+                try:
+                    logger.info(f">>>>>> Stage {spec.title} started <<<<<<")
+                    self.run_stage(spec, context)
+                    logger.info(f">>>>>> Stage {spec.title} completed <<<<<<\n\nx==========x")
+                except Exception as e:
+                    logger.exception(e)
+                    raise e
+
+                if context:
+                    completed.append(spec)
+                    produced += spec.outs
+                else:
+                    self._write_stamp(spec)
+        finally:
+            if context:
+                context.writer.close()
+
+        for spec in completed:
+            self._write_stamp(spec)
@@ -1,5 +1,6 @@
 from classifier.config.configuration import ConfigurationManager
 from classifier.components.data_ingestion import DataIngestion
+from classifier.components.dataset_packing import DatasetPacking
 from classifier import logger
 import gdown
 
@@ -9,19 +10,22 @@ class DataIngestionPipeline:
     def __init__(self):
         pass
     
-    def main(self):
+    def main(self, context=None):
         try:
-            logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-            config = ConfigurationManager()
+            config = context.config if context else ConfigurationManager()
             data_ingestion_config = config.get_data_ingestion_config()
             data_ingestion = DataIngestion(config=data_ingestion_config)
             data_ingestion.download_data()
             data_ingestion.extract_zip_file()
-            logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+            dataset_packing_config = config.get_dataset_packing_config()
+            dataset_packing = DatasetPacking(config=dataset_packing_config)
+            dataset_packing.pack()
         except Exception as e:
             logger.exception(e)
             raise e
 
 if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
     pipeline = DataIngestionPipeline()
-    pipeline.main()
\ No newline at end of file
+    pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
\ No newline at end of file
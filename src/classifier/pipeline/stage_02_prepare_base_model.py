@@ -11,20 +11,24 @@ class PrepareBaseModelPipeline:
     def __init__(self):
         pass
     
-    def main(self):
+    def main(self, context=None):
         try:
-            logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-            config = ConfigurationManager()
+            config = context.config if context else ConfigurationManager()
             prepare_base_model_config = config.get_prepare_base_model_config()
-            prepare_base_model = PrepareBaseModel(config=prepare_base_model_config)
+            prepare_base_model = PrepareBaseModel(
+                config=prepare_base_model_config,
+                writer=context.writer if context else None
+            )
             prepare_base_model.get_base_model()
             prepare_base_model.update_base_model()
-        
-            logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+            if context:
+                context.base_model = prepare_base_model.full_model
         except Exception as e:
             logger.exception(e)
             raise e
 
 if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
     pipeline = PrepareBaseModelPipeline()
-    pipeline.main()
\ No newline at end of file
+    pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
\ No newline at end of file
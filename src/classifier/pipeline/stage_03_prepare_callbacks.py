@@ -11,19 +11,20 @@ class PrepareCallbacksPipeline:
     def __init__(self):
         pass
     
-    def main(self):
+    def main(self, context=None):
         try:
-            logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-            config = ConfigurationManager()
+            config = context.config if context else ConfigurationManager()
             prepare_callbacks_config = config.get_prepare_callbacks_config()
             prepare_callbacks = PrepareCallbacks(config=prepare_callbacks_config)
             callback_list = prepare_callbacks.get_callbacks()
-        
-            logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+            if context:
+                context.callback_list = callback_list
         except Exception as e:
             logger.exception(e)
             raise e
 
 if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
     pipeline = PrepareCallbacksPipeline()
     pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
@@ -11,24 +11,33 @@ STAGE_NAME = "Training Stage"
 class ModelTrainingPipeline:
     def __init__(self):
         pass
-    def main(self):
+    def main(self, context=None):
         try:
-            logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
-            config = ConfigurationManager()
-            prepare_callbacks_config = config.get_prepare_callbacks_config()
-            prepare_callbacks = PrepareCallbacks(config=prepare_callbacks_config)
-            callback_list = prepare_callbacks.get_callbacks()
+            config = context.config if context else ConfigurationManager()
+            if context and context.callback_list is not None:
+                callback_list = context.callback_list
+            else:
+                prepare_callbacks_config = config.get_prepare_callbacks_config()
+                prepare_callbacks = PrepareCallbacks(config=prepare_callbacks_config)
+                callback_list = prepare_callbacks.get_callbacks()
             training_config = config.get_training_config()
-            training = Training(config=training_config)
-            training.get_base_model()
+            training = Training(
+                config=training_config,
+                writer=context.writer if context else None
+            )
+            training.get_base_model(model=context.base_model if context else None)
             training.train_valid_generator()
             training.train(callback_list=callback_list)
-        
-            logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+            if context:
+                context.trained_model = training.model
+                context.train_generator = training.train_generator
+                context.valid_generator = training.valid_generator
         except Exception as e:
             logger.exception(e)
             raise e
 
 if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
     pipeline = ModelTrainingPipeline()
-    pipeline.main()
\ No newline at end of file
+    pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
\ No newline at end of file
@@ -11,18 +11,25 @@ class EvaluationPipeline:
     def __init__(self):
         pass
     
-    def main(self):
+    def main(self, context=None):
         try:
-            config = ConfigurationManager()
+            config = context.config if context else ConfigurationManager()
             evaluation_config = config.get_evaluation_config()
-            evaluation = Evaluation(config=evaluation_config)
-            evaluation.evaluation()
+            evaluation = Evaluation(
+                config=evaluation_config,
+                writer=context.writer if context else None
+            )
+            evaluation.evaluation(
+                model=context.trained_model if context else None,
+                valid_generator=context.valid_generator if context else None
+            )
             evaluation.save_score()
         except Exception as e:
             logger.exception(e)
             raise e
 
 if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
     pipeline = EvaluationPipeline()
     pipeline.main()
     logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
\ No newline at end of file
@@ -0,0 +1,34 @@
+from classifier.config.configuration import ConfigurationManager
+from classifier.components.model_quantization import ModelQuantization
+from classifier import logger
+from classifier.constants import *
+from pathlib import Path
+
+
+STAGE_NAME = "Model Quantization Stage"
+
+class ModelQuantizationPipeline:
+    def __init__(self):
+        pass
+
+    def main(self, context=None):
+        try:
+            config = context.config if context else ConfigurationManager()
+            model_quantization_config = config.get_model_quantization_config()
+            model_quantization = ModelQuantization(
+                config=model_quantization_config,
+                writer=context.writer if context else None
+            )
+            model_quantization.load_model(model=context.trained_model if context else None)
+            model_quantization.convert()
+            model_quantization.evaluate(valid_generator=context.valid_generator if context else None)
+            model_quantization.save_score()
+        except Exception as e:
+            logger.exception(e)
+            raise e
+
+if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
+    pipeline = ModelQuantizationPipeline()
+    pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
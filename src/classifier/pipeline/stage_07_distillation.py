@@ -0,0 +1,46 @@
+from classifier.config.configuration import ConfigurationManager
+from classifier.components.distillation import Distillation
+from classifier.components.evaluation import Evaluation
+from classifier import logger
+from classifier.constants import *
+from pathlib import Path
+
+
+STAGE_NAME = "Distillation Stage"
+
+class DistillationPipeline:
+    def __init__(self):
+        pass
+
+    def main(self, context=None):
+        try:
+            config = context.config if context else ConfigurationManager()
+            distillation_config = config.get_distillation_config()
+            distillation = Distillation(
+                config=distillation_config,
+                writer=context.writer if context else None
+            )
+            distillation.get_teacher(model=context.trained_model if context else None)
+            distillation.get_student()
+            distillation.train_valid_dataset(
+                train_generator=context.train_generator if context else None,
+                valid_generator=context.valid_generator if context else None
+            )
+            distillation.train()
+
+            # scored exactly like the teacher in the evaluation stage
+            evaluation = Evaluation(
+                config=config.get_evaluation_config(path_of_model=distillation_config.student_model_path),
+                writer=context.writer if context else None
+            )
+            evaluation.evaluation(model=distillation.student, valid_generator=distillation.valid_generator)
+            evaluation.save_score(path=distillation_config.scores_path)
+        except Exception as e:
+            logger.exception(e)
+            raise e
+
+if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
+    pipeline = DistillationPipeline()
+    pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
@@ -0,0 +1,31 @@
+from classifier.config.configuration import ConfigurationManager
+from classifier.components.model_registry import ModelRegistration
+from classifier import logger
+from classifier.constants import *
+from pathlib import Path
+
+
+STAGE_NAME = "Model Registry Stage"
+
+class ModelRegistryPipeline:
+    def __init__(self):
+        pass
+
+    def main(self, context=None):
+        try:
+            config = context.config if context else ConfigurationManager()
+            model_registry_config = config.get_model_registry_config()
+            if context:
+                # every artifact must be on disk before it is copied
+                context.writer.wait()
+            model_registration = ModelRegistration(config=model_registry_config)
+            model_registration.register()
+        except Exception as e:
+            logger.exception(e)
+            raise e
+
+if __name__ == "__main__":
+    logger.info(f">>>>>> Stage {STAGE_NAME} started <<<<<<")
+    pipeline = ModelRegistryPipeline()
+    pipeline.main()
+    logger.info(f">>>>>> Stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
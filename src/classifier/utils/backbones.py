@@ -0,0 +1,108 @@
+import os
+import json
+from functools import partial
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from classifier import logger
+
+# backbone name in params.yaml -> (keras application, preprocessing it was trained with)
+BACKBONES = {
+    # Visual Geometry Group (Oxford), 19 weight layers, ~20 GFLOPs per image
+    "VGG19": (tf.keras.applications.VGG19, "vgg19"),
+    # the minimalistic variant: the hard-swish blocks of the full one cannot
+    # be reloaded from an .h5 artifact under Keras 3
+    "MobileNetV3": (partial(tf.keras.applications.MobileNetV3Large, minimalistic=True), "mobilenet_v3"),
+    "EfficientNetB0": (tf.keras.applications.EfficientNetB0, "efficientnet"),
+    "ResNet50": (tf.keras.applications.ResNet50, "resnet50"),
+}
+
+# every function takes 0-255 RGB floats
+PREPROCESSING = {
+    # models trained before the backbone was recorded next to them
+    "rescale": lambda images: images / 255.0,
+    "vgg19": tf.keras.applications.vgg19.preprocess_input,
+    "mobilenet_v3": tf.keras.applications.mobilenet_v3.preprocess_input,
+    "efficientnet": tf.keras.applications.efficientnet.preprocess_input,
+    "resnet50": tf.keras.applications.resnet50.preprocess_input,
+}
+
+LEGACY_METADATA = {"backbone": None, "preprocessing": "rescale"}
+
+
+def build_backbone(name: str, input_shape: list, weights: str, include_top: bool) -> tf.keras.Model:
+    """
+    Builds one of the supported backbones.
+
+    Args:
+        name (str): a key of BACKBONES.
+        input_shape (list): image size with channels.
+        weights (str): "imagenet", None, or the path of a local weights file.
+        include_top (bool): keep the ImageNet classifier.
+
+    Returns:
+        tf.keras.Model: the backbone.
+    """
+    if name not in BACKBONES:
+        raise ValueError(f"Unknown backbone '{name}', expected one of {list(BACKBONES)}")
+    if weights not in (None, "imagenet") and not os.path.exists(weights):
+        raise FileNotFoundError(f"Weights file not found at: {weights}")
+
+    application, _ = BACKBONES[name]
+    # keras loads a weights file path directly, so this also works offline
+    return application(input_shape=input_shape, weights=weights, include_top=include_top)
+
+
+def metadata_path(model_path: Path) -> Path:
+    """Sidecar file describing a saved model, e.g. trained_model.h5 -> trained_model.json."""
+    return Path(model_path).with_suffix(".json")
+
+
+def save_metadata(model_path: Path, metadata: dict):
+    path = metadata_path(model_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(metadata, f, indent=4)
+
+
+def persist_model(path: Path, model: tf.keras.Model, metadata: dict, writer=None):
+    """Writes the sidecar, then the model: in the background when an
+    ArtifactWriter is given (in-process runs), otherwise right away."""
+    save_metadata(path, metadata)
+    if writer is not None:
+        writer.save_model(path=path, model=model)
+    else:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        model.save(path)
+
+
+def load_metadata(model_path: Path) -> dict:
+    path = metadata_path(model_path)
+    if not path.exists():
+        logger.info(f"No metadata next to {model_path}, assuming /255 inputs")
+        return dict(LEGACY_METADATA)
+    with open(path) as f:
+        return json.load(f)
+
+
+def backbone_metadata(name: str) -> dict:
+    return {"backbone": name, "preprocessing": BACKBONES[name][1]}
+
+
+def get_preprocessing(model_path: Path):
+    """
+    The input preprocessing a saved model expects, read from its sidecar.
+
+    Returns:
+        callable: maps a batch of 0-255 RGB floats (NumPy or tensor) to model inputs.
+    """
+    preprocess_input = PREPROCESSING[load_metadata(model_path)["preprocessing"]]
+
+    def preprocess(images):
+        if isinstance(images, np.ndarray):
+            # keras' preprocess_input edits float arrays in place
+            images = images.astype("float32")
+        return preprocess_input(images)
+
+    return preprocess
@@ -0,0 +1,72 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with TTL for prediction results.
+
+    Keys are a SHA-256 of the encoded image bytes plus the identity of the
+    model that answered: its registry version, or the mtime and size its file
+    had when it was loaded. The whole cache is dropped when `set_model` is
+    called with another model. A `max_size` of 0 disables caching.
+    """
+
+    def __init__(self, max_size=1024, ttl_s=3600, model_version=None):
+        self.max_size = int(max_size)
+        self.ttl_s = float(ttl_s)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.model_version = model_version
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def set_model(self, model_version):
+        """Switches to the model now served, dropping every cached result."""
+        with self._lock:
+            self.model_version = model_version
+            self._entries.clear()
+
+    def key(self, data: bytes, model_version=None) -> str:
+        # a request still served by the old model keys on its own version
+        return f"{model_version or self.model_version}:{hashlib.sha256(data).hexdigest()}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            # a result computed before a model change must not be stored
+            if not key.startswith(f"{self.model_version}:"):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "model_version": self.model_version
+        }
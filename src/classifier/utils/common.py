@@ -52,7 +52,7 @@ def create_directories(path_to_directories: list, verbose=True):
 
 # evaluation metrics to store that json file we need this
 @ensure_annotations
-def save_json(self, path_to_json: Path, data: dict) -> None:
+def save_json(path_to_json: Path, data: dict):
     """
     Saves a dictionary to a JSON file.
 
@@ -67,7 +67,7 @@ def save_json(self, path_to_json: Path, data: dict) -> None:
 
 # to load a json file
 @ensure_annotations
-def load_json(self, path_to_json: Path) -> dict:
+def load_json(path_to_json: Path) -> dict:
     """
     Loads a dictionary from a JSON file.
 
@@ -84,7 +84,7 @@ def load_json(self, path_to_json: Path) -> dict:
 
 # to save a numpy array
 @ensure_annotations
-def save_numpy(self, path_to_numpy: Path, data: np.ndarray) -> None:
+def save_numpy(path_to_numpy: Path, data: np.ndarray):
     """
     Saves a numpy array to a numpy file.
 
@@ -97,7 +97,7 @@ def save_numpy(self, path_to_numpy: Path, data: np.ndarray) -> None:
 
 # to load a numpy array
 @ensure_annotations
-def load_numpy(self, path_to_numpy: Path) -> np.ndarray:
+def load_numpy(path_to_numpy: Path) -> np.ndarray:
     """
     Loads a numpy array from a numpy file.
 
@@ -113,7 +113,7 @@ def load_numpy(self, path_to_numpy: Path) -> np.ndarray:
 
 # to save a pickle file
 @ensure_annotations
-def save_pickle(self, path_to_pickle: Path, data: Any) -> None:
+def save_pickle(path_to_pickle: Path, data: Any):
     """
     Saves a pickle file.
 
@@ -127,7 +127,7 @@ def save_pickle(self, path_to_pickle: Path, data: Any) -> None:
 
 # to load a pickle file
 @ensure_annotations
-def load_pickle(self, path_to_pickle: Path) -> Any:
+def load_pickle(path_to_pickle: Path) -> Any:
     """
     Loads a pickle file.
 
@@ -144,7 +144,7 @@ def load_pickle(self, path_to_pickle: Path) -> Any:
 
 # to save a joblib file
 @ensure_annotations
-def save_joblib(self, path_to_joblib: Path, data: Any) -> None:
+def save_joblib(path_to_joblib: Path, data: Any):
     """
     Saves a joblib file.
 
@@ -157,7 +157,7 @@ def save_joblib(self, path_to_joblib: Path, data: Any) -> None:
 
 # to load a joblib file
 @ensure_annotations
-def load_joblib(self, path_to_joblib: Path) -> Any:
+def load_joblib(path_to_joblib: Path) -> Any:
     """
     Loads a joblib file.
 
@@ -171,12 +171,13 @@ def load_joblib(self, path_to_joblib: Path) -> Any:
     logger.info(f"joblib file: {path_to_joblib} loaded successfully")
     return data
 
-# to encode an image
-def decodeImage(imgstring, fileName):
+# to decode a base64 image, in memory unless a fileName is given
+def decodeImage(imgstring, fileName=None):
     imgdata = base64.b64decode(imgstring)
-    with open(fileName, 'wb') as f:
-        f.write(imgdata)
-        f.close()
+    if fileName is not None:
+        with open(fileName, 'wb') as f:
+            f.write(imgdata)
+    return imgdata
 
 # to decode the image.
 def encodeImageIntoBase64(croppedImagePath):
@@ -0,0 +1,53 @@
+import tensorflow as tf
+
+PRECISIONS = ("float32", "mixed_bfloat16")
+
+# the classifier output stays float32 so the softmax is computed at full precision
+OUTPUT_LAYER = "head_dense"
+
+
+def model_precision(model: tf.keras.Model) -> str:
+    """
+    Returns the dtype policy a model computes in.
+
+    Args:
+        model (tf.keras.Model): a Keras model.
+
+    Returns:
+        str: the policy name of its first layer with weights, e.g. "float32".
+    """
+    for layer in model.layers:
+        if layer.weights and layer.name != OUTPUT_LAYER:
+            return layer.dtype_policy.name
+    return "float32"
+
+
+def apply_precision(model: tf.keras.Model, precision: str) -> tf.keras.Model:
+    """
+    Rebuilds a functional model under a dtype policy, keeping its weights.
+
+    Mixed policies keep float32 variables, so the weights carry over as they
+    are; only the compute dtype of each layer changes. The input layer and
+    the output layer stay float32. The returned model is not compiled.
+
+    Args:
+        model (tf.keras.Model): the model to convert.
+        precision (str): one of PRECISIONS.
+
+    Returns:
+        tf.keras.Model: `model` itself if it already uses `precision`,
+            otherwise a rebuilt copy.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+    if model_precision(model) == precision:
+        return model
+
+    config = model.get_config()
+    for layer in config["layers"]:
+        if layer["class_name"] != "InputLayer" and layer["config"]["name"] != OUTPUT_LAYER:
+            layer["config"]["dtype"] = precision
+
+    converted = tf.keras.Model.from_config(config)
+    converted.set_weights(model.get_weights())
+    return converted
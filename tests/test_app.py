@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import pytest
+
+from classifier.utils.cache import PredictionCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeClassifier:
+    """Stands in for PredictionPipeline; answers with the size of each image."""
+
+    def __init__(self, heads=None):
+        self.heads = heads
+        self.calls = 0
+
+    def predict(self, img):
+        self.calls += 1
+        return {"size": len(img if isinstance(img, (bytes, bytearray)) else img.read()), "call": self.calls}
+
+    def predict_chunks(self, images, chunk_size=32):
+        results = []
+        for index, img in enumerate(images):
+            data = img if isinstance(img, (bytes, bytearray)) else img.read()
+            results.append({"index": index, "size": len(data)})
+        yield results
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    # app.py reads config/config.yaml relative to the working directory
+    monkeypatch.chdir(ROOT)
+    import app as app_module
+
+    app_module.clApp.ready.wait(timeout=120)
+    served = app_module.ServedModel(version="v0001", model_path=None, classifier=FakeClassifier())
+    monkeypatch.setattr(app_module.clApp, "active", served)
+    monkeypatch.setattr(app_module.clApp, "error", None)
+    return app_module.app.test_client()
+
+
+def test_batch_multipart_uploads_are_read_before_streaming(client):
+    response = client.post("/predict/batch", data={
+        "files": [(io.BytesIO(b"a" * 3), "a.png"), (io.BytesIO(b"b" * 5), "b.png")]
+    })
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert results == [{"index": 0, "size": 3}, {"index": 1, "size": 5}]
+
+
+def test_batch_json_images(client):
+    response = client.post("/predict/batch", json={"images": ["YWJj"]})
+
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True)) == {"index": 0, "size": 3}
+
+
+def serve(classifier, monkeypatch, version="v0001", model_path=None, cache_version=None):
+    import app as app_module
+
+    served = app_module.ServedModel(
+        version=version, model_path=model_path, classifier=classifier, cache_version=cache_version
+    )
+    monkeypatch.setattr(app_module.clApp, "active", served)
+    monkeypatch.setattr(app_module.clApp, "cache", PredictionCache(max_size=16, model_version=served.cache_version))
+
+
+def test_repeated_image_is_answered_from_the_cache(client, monkeypatch):
+    serve(FakeClassifier(), monkeypatch)
+
+    first = client.post("/predict", json={"image": "YWJj"}).get_json()
+    second = client.post("/predict", json={"image": "YWJj"}).get_json()
+
+    assert first == second == {"size": 3, "call": 1}
+
+
+def test_cache_is_bypassed_with_shadow_heads(client, monkeypatch):
+    # every request must reach the A/B routing and the shadow logging
+    serve(FakeClassifier(heads={"v0002": object()}), monkeypatch)
+
+    first = client.post("/predict", json={"image": "YWJj"}).get_json()
+    second = client.post("/predict", json={"image": "YWJj"}).get_json()
+
+    assert (first["call"], second["call"]) == (1, 2)
+
+
+def test_cache_keys_on_the_loaded_file_not_the_file_on_disk(client, monkeypatch, tmp_path):
+    # a bare model file is not reloaded when it changes, so neither is the cache
+    model_path = tmp_path / "trained_model.h5"
+    model_path.write_bytes(b"old")
+    serve(FakeClassifier(), monkeypatch, version=None, model_path=str(model_path), cache_version="file-1-3")
+    import app as app_module
+    app_module.clApp._swap(app_module.clApp.active)
+
+    first = client.post("/predict", json={"image": "YWJj"}).get_json()
+    model_path.write_bytes(b"new weights")
+    second = client.post("/predict", json={"image": "YWJj"}).get_json()
+
+    assert first == second == {"size": 3, "call": 1}
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from classifier.components.data_ingestion import DataIngestion
+from classifier.entity.config_entity import DataIngestionConfig
+
+MB = 1024 * 1024
+# three and a half 1 MB chunks
+PAYLOAD = os.urandom(3 * MB + MB // 2)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD, with Range support unless the server turns it off."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _headers(self, status, length, extra=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        for key, value in (extra or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(PAYLOAD))
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        if not (self.server.ranges and header):
+            self.server.requests.append(None)
+            self._headers(200, len(PAYLOAD))
+            self.wfile.write(PAYLOAD)
+            return
+
+        start, end = (int(value) for value in header.removeprefix("bytes=").split("-"))
+        self.server.requests.append(start)
+        if start in self.server.fail_once:
+            self.server.fail_once.discard(start)
+            self.send_error(500)
+            return
+        self._headers(206, end - start + 1, {"Content-Range": f"bytes {start}-{end}/{len(PAYLOAD)}"})
+        self.wfile.write(PAYLOAD[start:end + 1])
+
+
+@pytest.fixture()
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.ranges = True
+    httpd.fail_once = set()
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_ingestion(tmp_path, server, sha256="", url=None):
+    config = DataIngestionConfig(
+        root_dir=tmp_path,
+        source_URL=url or f"http://127.0.0.1:{server.server_address[1]}/data.zip",
+        local_data_file=tmp_path / "data.zip",
+        unzip_dir=tmp_path / "unzip",
+        extract_mode="full",
+        sha256=sha256,
+        download_workers=2,
+        download_chunk_mb=1
+    )
+    return DataIngestion(config)
+
+
+def test_resumes_after_a_failed_chunk(tmp_path, server):
+    ingestion = make_ingestion(tmp_path, server)
+    part_file = tmp_path / "data.zip.part"
+    server.fail_once.add(2 * MB)
+
+    with pytest.raises(Exception):
+        ingestion.download_in_chunks(ingestion.config.source_URL, part_file)
+    assert (tmp_path / "data.zip.part.json").exists()
+
+    # the rerun fetches only the chunk that failed
+    server.requests.clear()
+    ingestion.download_in_chunks(ingestion.config.source_URL, part_file)
+
+    assert server.requests == [2 * MB]
+    assert part_file.read_bytes() == PAYLOAD
+    assert not (tmp_path / "data.zip.part.json").exists()
+
+
+def test_server_without_range_support(tmp_path, server):
+    server.ranges = False
+    ingestion = make_ingestion(tmp_path, server)
+    part_file = tmp_path / "data.zip.part"
+
+    ingestion.download_in_chunks(ingestion.config.source_URL, part_file)
+
+    assert server.requests == [None]
+    assert part_file.read_bytes() == PAYLOAD
+    assert not (tmp_path / "data.zip.part.json").exists()
+
+
+def test_sha256_mismatch(tmp_path, server):
+    ingestion = make_ingestion(tmp_path, server, sha256="0" * 64)
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        ingestion.download_data()
+
+    assert not (tmp_path / "data.zip").exists()
+    assert not (tmp_path / "data.zip.part").exists()
+
+
+def test_sha256_match(tmp_path, server):
+    ingestion = make_ingestion(tmp_path, server, sha256=hashlib.sha256(PAYLOAD).hexdigest())
+
+    ingestion.download_data()
+
+    assert (tmp_path / "data.zip").read_bytes() == PAYLOAD
+
+
+def test_google_drive_download_resumes(tmp_path, server, monkeypatch):
+    calls = []
+
+    def fake_download(url, output, quiet=False, resume=False):
+        calls.append((url, output, resume))
+        with open(output, "wb") as f:
+            f.write(PAYLOAD)
+        return output
+
+    monkeypatch.setattr("classifier.components.data_ingestion.gdown.download", fake_download)
+    url = "https://drive.google.com/uc?export=download&id=abc"
+    ingestion = make_ingestion(tmp_path, server, sha256=hashlib.sha256(PAYLOAD).hexdigest(), url=url)
+
+    ingestion.download_data()
+
+    assert calls == [(url, str(tmp_path / "data.zip.part"), True)]
+    assert (tmp_path / "data.zip").read_bytes() == PAYLOAD